@@ -0,0 +1,50 @@
+"""Measure cold-start import cost of `toon_format`.
+
+Each case runs in a fresh interpreter. `import toon_format` only loads the
+package module; `from toon_format import *` loads every submodule, which is
+what every import cost before lazy loading.
+
+    python benchmarks/bench_import.py
+"""
+
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+CASES = {
+    "baseline (python -c pass)": "pass",
+    "import toon_format": "import toon_format",
+    "first encode": "import toon_format; toon_format.encode({'a': 1})",
+    "eager (import *)": "from toon_format import *",
+}
+
+_TIMER = (
+    "import time; _t = time.perf_counter(); {code}; "
+    "print(time.perf_counter() - _t)"
+)
+
+
+def _run(code, repeat=7):
+    env = dict(os.environ, PYTHONPATH=SRC, PYTHONDONTWRITEBYTECODE="")
+    timings = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(code=code)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def main():
+    for label, code in CASES.items():
+        print(f"{label:<28}{_run(code) * 1000:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark the YAML emitter and parser against the previous recursive versions.
+
+Run from the repository root:
+
+    python benchmarks/bench_yaml.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from decoder import _parse_primitive, _parse_yaml, _yaml_parse_inline
+from formats import _scalar_to_yaml, to_yaml_simple
+
+
+# Previous implementations, kept here as the baseline.
+def legacy_to_yaml(value, indent=0):
+    pad = " " * indent
+    if isinstance(value, dict):
+        lines = []
+        for k, v in value.items():
+            if isinstance(v, (dict, list)):
+                lines.append(f"{pad}{k}:")
+                lines.append(legacy_to_yaml(v, indent + 2))
+            else:
+                lines.append(f"{pad}{k}: {_scalar_to_yaml(v)}")
+        return "\n".join(lines)
+    if isinstance(value, list):
+        lines = []
+        for item in value:
+            if isinstance(item, (dict, list)):
+                lines.append(f"{pad}-")
+                lines.append(legacy_to_yaml(item, indent + 2))
+            else:
+                lines.append(f"{pad}- {_scalar_to_yaml(item)}")
+        return "\n".join(lines)
+    return f"{pad}{_scalar_to_yaml(value)}"
+
+
+def _legacy_indent(line):
+    return len(line) - len(line.lstrip(" "))
+
+
+def _legacy_parse_node(lines, idx, indent):
+    if idx >= len(lines):
+        return None, idx
+    line = lines[idx]
+    if _legacy_indent(line) < indent:
+        return None, idx
+    stripped = line.strip()
+    if stripped.startswith("-"):
+        items = []
+        while idx < len(lines) and _legacy_indent(lines[idx]) == indent:
+            item_line = lines[idx].strip()[1:].lstrip()
+            if item_line == "":
+                idx += 1
+                item, idx = _legacy_parse_node(lines, idx, indent + 2)
+                items.append(item)
+            else:
+                items.append(_yaml_parse_inline(item_line))
+                idx += 1
+        return items, idx
+    if ":" in stripped:
+        obj = {}
+        while idx < len(lines):
+            line = lines[idx]
+            if _legacy_indent(line) != indent:
+                break
+            content = line[indent:]
+            if ":" not in content:
+                break
+            key, rest = content.split(":", 1)
+            key_str = str(_parse_primitive(key.strip()))
+            if rest.strip() == "":
+                idx += 1
+                value, idx = _legacy_parse_node(lines, idx, indent + 2)
+                obj[key_str] = value
+            else:
+                obj[key_str] = _yaml_parse_inline(rest.strip())
+                idx += 1
+        return obj, idx
+    return _yaml_parse_inline(stripped), idx + 1
+
+
+def legacy_parse_yaml(text):
+    lines = [line for line in text.splitlines() if line.strip() != ""]
+    if not lines:
+        return None
+    value, _ = _legacy_parse_node(lines, 0, 0)
+    return value
+
+
+def _nested(depth, width):
+    if depth == 0:
+        return {"id": 1, "name": "leaf node", "tags": ["a", "b"]}
+    return {f"k{i}": _nested(depth - 1, width) for i in range(width)}
+
+
+CASES = {
+    "wide": {"users": [{"id": i, "name": f"user {i}", "active": i % 2 == 0} for i in range(2000)]},
+    "deep": _nested(8, 3),
+}
+
+
+def _bench(label, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<22}{seconds * 1000:>10.3f} ms")
+
+
+def main():
+    for name, value in CASES.items():
+        text = to_yaml_simple(value)
+        assert text == legacy_to_yaml(value)
+        assert _parse_yaml(text) == legacy_parse_yaml(text)
+        print(f"{name} ({len(text)} chars)")
+        _bench("emit legacy", lambda: legacy_to_yaml(value), 5)
+        _bench("emit", lambda: to_yaml_simple(value), 5)
+        _bench("parse legacy", lambda: legacy_parse_yaml(text), 5)
+        _bench("parse", lambda: _parse_yaml(text), 5)
+
+
+if __name__ == "__main__":
+    main()
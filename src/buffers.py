@@ -0,0 +1,329 @@
+"""Bytes-level TOON encoding and decoding.
+
+The decoder scans UTF-8 input through a `memoryview` (or an `mmap` for files)
+with byte-pattern regexes. Structural characters are all ASCII, so multi-byte
+sequences never need decoding during the scan; a token is only turned into a
+`str` when its value is materialized.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+from typing import Any, Iterator
+
+from decoder import (
+    _SCHEMA_DEF_RE,
+    _DecodeContext,
+    _intern_table,
+    _intern_value,
+    _parse_primitive,
+    _resolve_string,
+    _table_header,
+    _table_row,
+    _unescape_string,
+)
+from encoder import _encode_pieces
+
+_WS_RE = re.compile(rb"\s*")
+_QUOTED_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"?', re.S)
+_BARE_RE = re.compile(rb"[^{}\[\]|,^\s]*")
+# Table rows toggle quoting on any quote character, mirroring _read_segment.
+_SEGMENT_RE = re.compile(rb'"(?:[^"\\]|\\.)*"?|\\.|[|\],]', re.S)
+_JSON_SCAN_RE = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.S)
+_SCHEMA_REF_RE = re.compile(rb"@(\d+)\s*")
+_DICT_PREAMBLE_RE = re.compile(rb"\s*\^\s*dict\s*\[", re.IGNORECASE)
+_SCHEMA_PREAMBLE_RE = re.compile(rb"\s*\^\s*schema", re.IGNORECASE)
+
+_OPEN_OBJECT = ord("{")
+_CLOSE_OBJECT = ord("}")
+_OPEN_ARRAY = ord("[")
+_CLOSE_ARRAY = ord("]")
+_PIPE = ord("|")
+_COMMA = ord(",")
+_CARET = ord("^")
+_QUOTE = ord("\"")
+
+# File targets are written in batches of at least this many bytes.
+_WRITE_CHUNK = 1 << 16
+
+
+def _text(buf: Any, start: int, end: int) -> str:
+    return str(buf[start:end], "utf-8")
+
+
+def _skip_ws(buf: Any, pos: int) -> int:
+    return _WS_RE.match(buf, pos).end()
+
+
+def _parse_token(buf: Any, pos: int) -> tuple[str, bool, int]:
+    """Return (text, quoted, end) for the token at `pos`."""
+    pos = _skip_ws(buf, pos)
+    if pos < len(buf) and buf[pos] == _QUOTE:
+        match = _QUOTED_RE.match(buf, pos)
+        return _unescape_string(_text(buf, match.start(1), match.end(1))), True, match.end()
+    match = _BARE_RE.match(buf, pos)
+    return _text(buf, pos, match.end()), False, match.end()
+
+
+def _parse_value(buf: Any, pos: int, ctx: _DecodeContext) -> tuple[Any, int]:
+    pos = _skip_ws(buf, pos)
+    if pos >= len(buf):
+        return None, pos
+    ch = buf[pos]
+    if ch == _OPEN_OBJECT:
+        return _parse_object(buf, pos, ctx)
+    if ch == _OPEN_ARRAY:
+        return _parse_array(buf, pos, ctx)
+    if ch == _CARET:
+        return _parse_table(buf, pos, ctx)
+    token, quoted, pos = _parse_token(buf, pos)
+    if quoted:
+        return _intern_value(token, ctx.values), pos
+    if ctx.strings is not None:
+        return _resolve_string(token, ctx.strings), pos
+    return _intern_value(_parse_primitive(token), ctx.values), pos
+
+
+def _parse_keys(buf: Any, pos: int, ctx: _DecodeContext) -> tuple[list[str], int]:
+    """Parse `key,key...`; return the keys and the offset of the terminating byte."""
+    keys = []
+    while pos < len(buf):
+        key, _, pos = _parse_token(buf, pos)
+        keys.append(ctx.key(key))
+        pos = _skip_ws(buf, pos)
+        if pos >= len(buf) or buf[pos] != _COMMA:
+            break
+        pos += 1
+    return keys, pos
+
+
+def _parse_object(buf: Any, pos: int, ctx: _DecodeContext) -> tuple[dict[str, Any], int]:
+    obj: dict[str, Any] = {}
+    pos = _skip_ws(buf, pos + 1)
+    if pos < len(buf) and buf[pos] == _CLOSE_OBJECT:
+        return obj, pos + 1
+    ref = _SCHEMA_REF_RE.match(buf, pos) if ctx.schema_ids else None
+    schema_id = None
+    if ref is not None and ref.end() < len(buf) and buf[ref.end()] in (_COMMA, _PIPE):
+        schema_id = int(ref.group(1))
+        pos = ref.end() + 1
+    if schema_id is not None and buf[pos - 1] == _PIPE:
+        keys = ctx.resolve(schema_id)
+    else:
+        keys, pos = _parse_keys(buf, pos, ctx)
+        if pos >= len(buf):
+            return obj, pos
+        if buf[pos] == _CLOSE_OBJECT:
+            return obj, pos + 1
+        pos += 1
+        if schema_id is not None:
+            ctx.define(schema_id, keys)
+    for key in keys:
+        value, pos = _parse_value(buf, pos, ctx)
+        obj[key] = value
+        pos = _skip_ws(buf, pos)
+        if pos >= len(buf):
+            break
+        if buf[pos] == _PIPE:
+            pos += 1
+            continue
+        if buf[pos] == _CLOSE_OBJECT:
+            return obj, pos + 1
+    return obj, pos
+
+
+def _parse_array(buf: Any, pos: int, ctx: _DecodeContext) -> tuple[list[Any], int]:
+    items: list[Any] = []
+    pos = _skip_ws(buf, pos + 1)
+    if pos < len(buf) and buf[pos] == _CLOSE_ARRAY:
+        return items, pos + 1
+    while pos < len(buf):
+        value, pos = _parse_value(buf, pos, ctx)
+        items.append(value)
+        pos = _skip_ws(buf, pos)
+        if pos >= len(buf):
+            break
+        if buf[pos] == _PIPE:
+            pos += 1
+            continue
+        if buf[pos] == _CLOSE_ARRAY:
+            return items, pos + 1
+    return items, pos
+
+
+def _iter_rows(buf: Any, pos: int) -> tuple[list[list[str]], int]:
+    """Split `|`-delimited rows of `,`-delimited cells up to the closing `]`."""
+    rows: list[list[str]] = []
+    cells: list[str] = []
+    start = pos
+    for match in _SEGMENT_RE.finditer(buf, pos):
+        ch = buf[match.start()]
+        if ch == _QUOTE or match.end() - match.start() > 1:
+            continue
+        cells.append(_text(buf, start, match.start()))
+        start = match.end()
+        if ch == _COMMA:
+            continue
+        if ch == _CLOSE_ARRAY and cells == [""]:
+            return rows, match.end()
+        rows.append(cells)
+        cells = []
+        if ch == _CLOSE_ARRAY:
+            return rows, match.end()
+    cells.append(_text(buf, start, len(buf)))
+    rows.append(cells)
+    return rows, len(buf)
+
+
+def _parse_json_fragment(buf: Any, pos: int) -> tuple[Any, int]:
+    depth = 0
+    for match in _JSON_SCAN_RE.finditer(buf, pos):
+        ch = buf[match.start()]
+        if ch == _QUOTE:
+            continue
+        depth += 1 if ch in (_OPEN_OBJECT, _OPEN_ARRAY) else -1
+        if depth == 0:
+            return json.loads(bytes(buf[pos : match.end()])), match.end()
+    raise ValueError("Unterminated json fragment")
+
+
+def _parse_table(buf: Any, pos: int, ctx: _DecodeContext) -> tuple[Any, int]:
+    pos = _skip_ws(buf, pos + 1)
+    if bytes(buf[pos : pos + 4]).lower() == b"json":
+        return _parse_json_fragment(buf, _skip_ws(buf, pos + 4))
+    ref = _SCHEMA_REF_RE.match(buf, pos)
+    if ref is not None:
+        pos = ref.end()
+        if pos >= len(buf) or buf[pos] != _OPEN_ARRAY:
+            raise ValueError("Invalid table rows")
+        keys = ctx.resolve(int(ref.group(1)))
+        pos = _skip_ws(buf, pos + 1)
+        if pos < len(buf) and buf[pos] == _CLOSE_ARRAY:
+            return [], pos + 1
+        rows, pos = _iter_rows(buf, pos)
+        return [_table_row(keys, cells, ctx.strings, ctx.values) for cells in rows], pos
+    if bytes(buf[pos : pos + 3]).lower() == b"csv":
+        pos = _skip_ws(buf, pos + 3)
+        if pos >= len(buf) or buf[pos] != _OPEN_ARRAY:
+            raise ValueError("Invalid csv table rows")
+        pos = _skip_ws(buf, pos + 1)
+        if pos < len(buf) and buf[pos] == _CLOSE_ARRAY:
+            return [], pos + 1
+        rows, pos = _iter_rows(buf, pos)
+        if not rows:
+            return [], pos
+        header = rows[0]
+        definition = _SCHEMA_DEF_RE.fullmatch(header[0]) if ctx.schema_ids else None
+        keys = _table_header(header[1:] if definition else header, ctx)
+        if definition:
+            ctx.define(int(definition.group(1)), keys)
+        return [_table_row(keys, cells, ctx.strings, ctx.values) for cells in rows[1:]], pos
+    if pos >= len(buf) or buf[pos] != _OPEN_OBJECT:
+        raise ValueError("Invalid table header")
+    pos = _skip_ws(buf, pos + 1)
+    keys: list[str] = []
+    if pos < len(buf) and buf[pos] != _CLOSE_OBJECT:
+        keys, pos = _parse_keys(buf, pos, ctx)
+    pos = _skip_ws(buf, pos + 1)
+    if pos >= len(buf) or buf[pos] != _OPEN_ARRAY:
+        raise ValueError("Invalid table rows")
+    pos = _skip_ws(buf, pos + 1)
+    if pos < len(buf) and buf[pos] == _CLOSE_ARRAY:
+        return [], pos + 1
+    rows, pos = _iter_rows(buf, pos)
+    return [_table_row(keys, cells, values=ctx.values) for cells in rows], pos
+
+
+def _utf8_pieces(value: Any, options: dict | None) -> Iterator[bytes]:
+    for piece in _encode_pieces(value, options):
+        yield piece.encode("utf-8")
+
+
+def encode_bytes(value: Any, options: dict | None = None) -> bytes:
+    """Encode a Python value into UTF-8 TOON bytes.
+
+    The text is encoded to UTF-8 piece by piece (see `dump`), so the full
+    `str` is never built.
+    """
+    return b"".join(_utf8_pieces(value, options))
+
+
+def dump(value: Any, target: Any, options: dict | None = None) -> int:
+    """Encode a Python value as UTF-8 TOON into `target`.
+
+    The output is produced in pieces (a container's children, or chunks of
+    table rows) that are encoded to UTF-8 and written as they are ready, so
+    neither the full `str` nor the full bytes are held at once.
+
+    Args:
+        value: Python value to encode.
+        target: A `bytearray` (appended to), a binary file-like object with
+            `write`, or any writable buffer (filled from the start).
+        options: Same as `encode`.
+
+    Returns:
+        Number of bytes written.
+
+    Raises:
+        ValueError: If a writable buffer is too small; the bytes that fit
+            have been written.
+    """
+    size = 0
+    if isinstance(target, bytearray):
+        for data in _utf8_pieces(value, options):
+            target += data
+            size += len(data)
+    elif hasattr(target, "write"):
+        batch = bytearray()
+        for data in _utf8_pieces(value, options):
+            batch += data
+            if len(batch) >= _WRITE_CHUNK:
+                target.write(batch)
+                size += len(batch)
+                batch.clear()
+        if batch:
+            target.write(batch)
+            size += len(batch)
+    else:
+        view = memoryview(target).cast("B")
+        for data in _utf8_pieces(value, options):
+            end = size + len(data)
+            if end > len(view):
+                view[size:] = data[: len(view) - size]
+                raise ValueError(f"Buffer too small: need more than {len(view)} bytes")
+            view[size:end] = data
+            size = end
+    return size
+
+
+def decode_bytes(data: Any, options: dict | None = None) -> Any:
+    """Decode UTF-8 TOON from bytes, bytearray, memoryview or mmap.
+
+    The input is scanned in place; only materialized tokens are decoded to `str`.
+    `options` accepts `schema_registry` and `intern_values` as in `decode`.
+    """
+    buf = data if isinstance(data, (bytes, mmap.mmap)) else memoryview(data).cast("B")
+    ctx = _DecodeContext(options.get("schema_registry") if options else None, _intern_table(options))
+    pos = 0
+    marker = _SCHEMA_PREAMBLE_RE.match(buf)
+    if marker is not None:
+        ctx.schema_ids = True
+        pos = marker.end()
+    preamble = _DICT_PREAMBLE_RE.match(buf, pos)
+    if preamble is not None:
+        strings, pos = _parse_array(buf, preamble.end() - 1, ctx)
+        ctx.strings = [str(item) for item in strings]
+    value, _ = _parse_value(buf, pos, ctx)
+    return value
+
+
+def load(path: str | os.PathLike, options: dict | None = None) -> Any:
+    """Decode a UTF-8 TOON file by memory-mapping it instead of reading it into a `str`."""
+    with open(path, "rb") as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_bytes(mapped, options)
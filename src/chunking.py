@@ -0,0 +1,196 @@
+"""Token-bounded splitting of values into independently decodable TOON chunks."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator
+
+from encoder import (
+    _encode,
+    _encode_column,
+    _encode_rows,
+    _encode_string,
+    _resolve_options,
+    _table_columns,
+    _table_floats,
+    normalize_value,
+)
+from tokens import count_tokens_many
+
+# Container brackets as counted pieces: a container's cost includes the `|` before it.
+_BRACKETS = ("|{", "}", "|[", "]")
+
+
+class _Node:
+    """A value with its token cost as a `|`-prefixed piece of its container.
+
+    Containers also keep the costs of their own pieces (object entries, array
+    items or table rows), so a container that is split needs no new counts.
+    `first` is the index of the node's first text in the batch being counted.
+    """
+
+    __slots__ = ("value", "cost", "first", "header", "keys", "children", "costs")
+
+    def __init__(self, value: Any, first: int):
+        self.value = value
+        self.cost = 0
+        self.first = first
+        self.header: str | None = None
+        self.keys: list[str] | None = None
+        self.children: list[Any] = []
+        self.costs: list[int] = []
+
+
+def _measure(value: Any, opts: dict[str, Any], texts: list[str]) -> _Node:
+    """Build the node tree of `value`, adding every text it needs counted to `texts`."""
+    node = _Node(value, len(texts))
+    if isinstance(value, dict) and value:
+        node.keys = [_encode_string(str(k)) for k in value]
+        texts.extend(f",{k}" for k in node.keys)
+        node.children = [_measure(v, opts, texts) for v in value.values()]
+    elif isinstance(value, list) and value:
+        columns = _table_columns(value, opts["sparsity"], opts["flatten"])
+        if columns is not None:
+            # Every chunk repeats the table header; rows are never split.
+            node.header = ",".join(_encode_column(path) for path in columns)
+            node.children = [f"|{row}" for row in _encode_rows(value, columns, floats=_table_floats(columns, opts))]
+            texts.append(f"|^csv[{node.header}")
+            texts.extend(node.children)
+        else:
+            node.children = [_measure(item, opts, texts) for item in value]
+    else:
+        texts.append(f"|{_encode(value, opts)}")
+    return node
+
+
+def _resolve(node: _Node, counts: list[int]) -> int:
+    """Fill in the costs of `node` and its pieces from `counts`; return its own cost."""
+    first = node.first
+    if node.header is not None:
+        node.costs = counts[first + 1 : first + 1 + len(node.children)]
+        node.cost = counts[first] + sum(node.costs) + counts[3]
+    elif node.keys is not None:
+        keys = counts[first : first + len(node.keys)]
+        node.costs = [k + _resolve(child, counts) for k, child in zip(keys, node.children)]
+        node.cost = counts[0] + sum(node.costs) + counts[1]
+    elif node.children:
+        node.costs = [_resolve(child, counts) for child in node.children]
+        node.cost = counts[2] + sum(node.costs) + counts[3]
+    else:
+        node.cost = counts[first]
+    return node.cost
+
+
+def _split(
+    node: _Node,
+    prefix: str,
+    suffix: str,
+    max_tokens: int,
+    opts: dict[str, Any],
+    count: Callable[[list[str]], list[int]],
+) -> Iterator[str]:
+    """Yield chunks of `node`, each wrapped in `prefix`/`suffix` (its enclosing containers).
+
+    Pieces (one object entry, array item or table row each) are packed
+    greedily by their measured costs. A piece that cannot fit on its own is
+    split recursively inside its own wrapper, reusing its measured pieces;
+    only the wrappers are counted again.
+    """
+    child: Callable[[int], Iterator[str]] | None = None
+    keys, children = node.keys, node.children
+    if node.header is not None:
+        head, tail = f"{prefix}^csv[{node.header}", "]" + suffix
+
+        def render(group: list[int]) -> str:
+            return head + "".join(children[i] for i in group) + tail
+
+    elif keys is not None:
+        head, tail = prefix + "{", "}" + suffix
+
+        def render(group: list[int]) -> str:
+            values = "|".join(_encode(children[i].value, opts) for i in group)
+            return f"{head}{','.join(keys[i] for i in group)}|{values}{tail}"
+
+        def child(i: int) -> Iterator[str]:
+            return _split(children[i], f"{head}{keys[i]}|", tail, max_tokens, opts, count)
+
+    elif children:
+        head, tail = prefix + "[", "]" + suffix
+
+        def render(group: list[int]) -> str:
+            return head + "|".join(_encode(children[i].value, opts) for i in group) + tail
+
+        def child(i: int) -> Iterator[str]:
+            return _split(children[i], head, tail, max_tokens, opts, count)
+
+    else:
+        text = prefix + _encode(node.value, opts) + suffix
+        cost = count([text])[0]
+        if cost > max_tokens:
+            raise ValueError(f"Value needs {cost} tokens, over max_tokens={max_tokens}: {text[:40]!r}")
+        yield text
+        return
+
+    frame = sum(count([head, tail]))
+    group: list[int] = []
+    used = frame
+    for i, cost in enumerate(node.costs):
+        if frame + cost > max_tokens:
+            if group:
+                yield render(group)
+                group, used = [], frame
+            if child is None:
+                raise ValueError(f"Table row {i} needs {frame + cost} tokens with its header, over max_tokens={max_tokens}")
+            yield from child(i)
+            continue
+        if used + cost > max_tokens:
+            yield render(group)
+            group, used = [], frame
+        group.append(i)
+        used += cost
+    if group:
+        yield render(group)
+
+
+def encode_chunks(
+    value: Any, max_tokens: int, options: dict | None = None, model: str | None = None
+) -> Iterator[str]:
+    """Split a value into self-contained TOON chunks of at most `max_tokens` each.
+
+    Objects are split between entries and arrays between items; tables are
+    split at row boundaries with the header repeated in every chunk. A
+    nested value too large for one chunk is split in turn, each piece
+    wrapped in its enclosing keys so that every chunk decodes on its own
+    (`{users|^csv[id|1|2]}`, `{users|^csv[id|3]}`).
+
+    Every primitive, key and table row is tokenized once, in one batched
+    call, and container costs are the sums of their pieces; chunks are not
+    re-tokenized, so the sum may differ slightly from a count of the joined
+    text. Only the enclosing wrappers of split containers are counted again.
+
+    Args:
+        value: Python value to encode.
+        max_tokens: Token budget per chunk.
+        options: `sparsity` and `flatten` as in `encode`. Schema registries
+            and string dictionaries are not used, since chunks must decode
+            independently.
+        model: Tokenizer model passed to `count_tokens_many`.
+
+    Yields:
+        TOON strings; a value that fits the budget is yielded whole.
+
+    Raises:
+        ValueError: If a primitive or a single table row cannot fit.
+    """
+    if max_tokens < 1:
+        raise ValueError(f"max_tokens must be positive, got {max_tokens}")
+    opts = _resolve_options(options)
+    opts["schema_registry"] = None
+    opts["dedupe_strings"] = False
+
+    def count(texts: list[str]) -> list[int]:
+        return count_tokens_many(texts, [model])[model]
+
+    texts = list(_BRACKETS)
+    node = _measure(normalize_value(value), opts, texts)
+    _resolve(node, count(texts))
+    yield from _split(node, "", "", max_tokens, opts, count)
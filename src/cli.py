@@ -0,0 +1,397 @@
+"""`toon` command-line interface.
+
+    toon encode data.json                  # JSON/CSV/JSONL/YAML -> TOON
+    toon decode --to json < data.toon      # stdin -> stdout
+    toon convert --to csv -o out/ *.toon --jobs 4
+    toon compare --formats toon,json,yaml corpus/*.jsonl
+
+With no files, stdin is streamed to stdout. With files, each is converted
+independently (across `--jobs` processes) and written to `--output-dir`, or
+to stdout in input order. Throughput and token statistics go to stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Any
+
+from compare import _iter_stream, compare_corpus
+from convert import convert_stream
+from detect import detect_format
+from tokens import count_tokens_many
+
+_EXTENSIONS = {
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".csv": "csv",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".toon": "toon",
+}
+_SUFFIXES = {"json": ".json", "json_pretty": ".json", "csv": ".csv", "yaml": ".yaml", "toon": ".toon"}
+_SOURCE_FORMATS = ("auto", "json", "jsonl", "csv", "yaml", "toon")
+_TARGET_FORMATS = ("toon", "json", "json_pretty", "yaml", "csv")
+# Text is tokenized in pieces of this size so statistics never hold a whole file.
+_STATS_CHUNK = 1 << 16
+
+
+def _source_format(path: Path | None, source_format: str) -> str:
+    """Return the format named by `--from` or the file suffix, or `auto` to sniff the input."""
+    if source_format != "auto":
+        return source_format
+    if path is not None and path.suffix.lower() in _EXTENSIONS:
+        return _EXTENSIONS[path.suffix.lower()]
+    return "auto"
+
+
+def _sniff_format(head: str) -> str:
+    """Guess the format of input that starts with `head` (at most `_STATS_CHUNK` characters)."""
+    text = head.lstrip()
+    if not text:
+        return "json"
+    first, newline, rest = text.partition("\n")
+    if newline and rest.strip():
+        # Several lines that each hold a complete JSON container: JSON Lines.
+        try:
+            record = json.loads(first)
+        except ValueError:
+            record = None
+        if isinstance(record, (dict, list)):
+            return "jsonl"
+    if len(head) >= _STATS_CHUNK and text[0] in "{[":
+        # A truncated container does not parse as JSON; TOON always has pipes.
+        return "toon" if "|" in text else "json"
+    fmt = detect_format(head)
+    if fmt == "unknown":
+        raise ValueError("cannot detect the input format; pass --from")
+    return fmt
+
+
+class _TokenTally:
+    """Running token count over text seen in arbitrary pieces, tokenized in batches."""
+
+    __slots__ = ("total", "_pending", "_size")
+
+    def __init__(self):
+        self.total = 0
+        self._pending: list[str] = []
+        self._size = 0
+
+    def add(self, text: str) -> None:
+        self._pending.append(text)
+        self._size += len(text)
+        if self._size >= _STATS_CHUNK:
+            self.flush()
+
+    def flush(self) -> int:
+        if self._pending:
+            self.total += count_tokens_many(["".join(self._pending)])[None][0]
+            self._pending, self._size = [], 0
+        return self.total
+
+
+def _count_text_tokens(fp: IO[str]) -> int:
+    tally = _TokenTally()
+    for chunk in iter(lambda: fp.read(_STATS_CHUNK), ""):
+        tally.add(chunk)
+    return tally.flush()
+
+
+def _output_path(path: str, output_dir: str, target_format: str) -> Path:
+    return Path(output_dir) / (Path(path).stem + _SUFFIXES[target_format])
+
+
+def _check_outputs(paths: list[str], output_dir: str, target_format: str) -> None:
+    """Refuse to overwrite an input or to write two inputs to the same output file."""
+    inputs = {Path(path).resolve() for path in paths}
+    seen: dict[Path, str] = {}
+    for path in paths:
+        out_path = _output_path(path, output_dir, target_format).resolve()
+        if out_path in inputs:
+            raise ValueError(f"output {out_path} would overwrite an input file")
+        if out_path in seen:
+            raise ValueError(f"{seen[out_path]} and {path} would both be written to {out_path}")
+        seen[out_path] = path
+
+
+def _write_atomic(out_path: Path, write: Any) -> Any:
+    """Call `write(target)` on a temp file next to `out_path`, then move it into place."""
+    fd, tmp = tempfile.mkstemp(dir=out_path.parent, prefix=f".{out_path.name}.", suffix=".tmp")
+    try:
+        with open(fd, "w", encoding="utf-8", newline="") as target:
+            result = write(target)
+        os.replace(tmp, out_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return result
+
+
+def _convert_file(path: str, source_format: str, target_format: str, output_dir: str | None, tokens: bool) -> dict:
+    """Convert one file; return its statistics and, without `output_dir`, its output text."""
+    src = Path(path)
+    fmt = _source_format(src, source_format)
+    result: dict[str, Any] = {"path": path, "text": None}
+    with open(src, encoding="utf-8", newline="") as source:
+        if fmt == "auto":
+            fmt = _sniff_format(source.read(_STATS_CHUNK))
+            source.seek(0)
+        if output_dir is None:
+            target: IO[str] = io.StringIO()
+            result["records"] = convert_stream(source, target, fmt, target_format)
+            result["text"] = target.getvalue()
+            out_path = None
+        else:
+            out_path = _output_path(path, output_dir, target_format)
+            result["records"] = _write_atomic(
+                out_path, lambda target: convert_stream(source, target, fmt, target_format)
+            )
+    result["bytes_in"] = src.stat().st_size
+    if out_path is None:
+        result["bytes_out"] = len(result["text"].encode("utf-8"))
+    else:
+        result["bytes_out"] = out_path.stat().st_size
+    if tokens:
+        with open(src, encoding="utf-8") as fp:
+            result["tokens_in"] = _count_text_tokens(fp)
+        if out_path is None:
+            result["tokens_out"] = _count_text_tokens(io.StringIO(result["text"]))
+        else:
+            with open(out_path, encoding="utf-8") as fp:
+                result["tokens_out"] = _count_text_tokens(fp)
+    return result
+
+
+def _run_files(args: argparse.Namespace, source_format: str, target_format: str) -> list[dict]:
+    if args.output_dir is not None:
+        # Checked before anything is converted, so a bad invocation writes nothing.
+        _check_outputs(args.files, args.output_dir, target_format)
+        os.makedirs(args.output_dir, exist_ok=True)
+    task = (source_format, target_format, args.output_dir, not args.quiet)
+    results = []
+    if args.jobs > 1 and len(args.files) > 1:
+        with ProcessPoolExecutor(args.jobs) as pool:
+            futures = [pool.submit(_convert_file, path, *task) for path in args.files]
+            # Written in input order as soon as each result is ready.
+            for future in futures:
+                results.append(_emit(future.result()))
+    else:
+        for path in args.files:
+            results.append(_emit(_convert_file(path, *task)))
+    return results
+
+
+def _emit(result: dict) -> dict:
+    if result["text"] is not None:
+        sys.stdout.write(result["text"])
+        sys.stdout.write("\n")
+        result["text"] = None
+    return result
+
+
+class _CountingReader(io.TextIOBase):
+    """Text stream wrapper that counts characters and optionally tokens as they are read.
+
+    `head` is text already read from `stream` (to sniff its format); it is
+    returned first.
+    """
+
+    def __init__(self, stream: IO[str], tokens: bool, head: str = ""):
+        self._stream = stream
+        self._head = io.StringIO(head)
+        self.chars = 0
+        self.tally = _TokenTally() if tokens else None
+
+    def readable(self) -> bool:
+        return True
+
+    def _seen(self, text: str) -> str:
+        self.chars += len(text)
+        if self.tally is not None:
+            self.tally.add(text)
+        return text
+
+    def read(self, size: int | None = -1) -> str:
+        text = self._head.read(size)
+        if size is None or size < 0:
+            text += self._stream.read()
+        elif len(text) < size:
+            text += self._stream.read(size - len(text))
+        return self._seen(text)
+
+    def readline(self, size: int | None = -1) -> str:
+        text = self._head.readline(size)
+        if not text.endswith("\n"):
+            if size is None or size < 0:
+                text += self._stream.readline()
+            elif len(text) < size:
+                text += self._stream.readline(size - len(text))
+        return self._seen(text)
+
+    def __next__(self) -> str:
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
+
+class _CountingWriter(io.TextIOBase):
+    """Text stream wrapper that counts characters and optionally tokens as they are written."""
+
+    def __init__(self, stream: IO[str], tokens: bool):
+        self._stream = stream
+        self.chars = 0
+        self.tally = _TokenTally() if tokens else None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.chars += len(text)
+        if self.tally is not None:
+            self.tally.add(text)
+        return self._stream.write(text)
+
+
+def _run_stdin(args: argparse.Namespace, source_format: str, target_format: str) -> list[dict]:
+    tokens = not args.quiet
+    fmt = _source_format(None, source_format)
+    head = ""
+    if fmt == "auto":
+        head = sys.stdin.read(_STATS_CHUNK)
+        fmt = _sniff_format(head)
+    source = _CountingReader(sys.stdin, tokens, head)
+    target = _CountingWriter(sys.stdout, tokens)
+    records = convert_stream(source, target, fmt, target_format)
+    sys.stdout.write("\n")
+    result = {"records": records, "bytes_in": source.chars, "bytes_out": target.chars}
+    if tokens:
+        result.update(tokens_in=source.tally.flush(), tokens_out=target.tally.flush())
+    return [result]
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _print_stats(results: list[dict], seconds: float) -> None:
+    bytes_in = sum(r["bytes_in"] for r in results)
+    bytes_out = sum(r["bytes_out"] for r in results)
+    records = sum(r["records"] for r in results)
+    rate = bytes_in / seconds if seconds > 0 else 0.0
+    lines = [
+        f"files: {len(results)}  records: {records}  in: {_format_size(bytes_in)}  "
+        f"out: {_format_size(bytes_out)}  time: {seconds:.2f}s  ({_format_size(rate)}/s)",
+    ]
+    if results and "tokens_in" in results[0]:
+        tokens_in = sum(r["tokens_in"] for r in results)
+        tokens_out = sum(r["tokens_out"] for r in results)
+        saved = (tokens_in - tokens_out) / tokens_in * 100 if tokens_in else 0.0
+        lines.append(f"tokens: {tokens_in} -> {tokens_out} ({saved:.1f}% saved)")
+    print("\n".join(lines), file=sys.stderr)
+
+
+def _convert_command(args: argparse.Namespace) -> int:
+    if args.command == "encode":
+        source_format, target_format = args.source_format, "toon"
+    elif args.command == "decode":
+        source_format, target_format = "toon", args.target_format
+    else:
+        source_format, target_format = args.source_format, args.target_format
+    start = time.perf_counter()
+    if args.files:
+        results = _run_files(args, source_format, target_format)
+    else:
+        results = _run_stdin(args, source_format, target_format)
+    sys.stdout.flush()
+    if not args.quiet:
+        _print_stats(results, time.perf_counter() - start)
+    return 0
+
+
+def _compare_command(args: argparse.Namespace) -> int:
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    start = time.perf_counter()
+    if args.files:
+        source: Any = [Path(path) for path in args.files]
+    else:
+        head = sys.stdin.read(_STATS_CHUNK)
+        fmt = args.source_format if args.source_format != "auto" else _sniff_format(head)
+        # Records are split as for a file in that format, so stdin and file reports agree.
+        source = _iter_stream(_CountingReader(sys.stdin, False, head), fmt)
+    report = compare_corpus(source, formats=formats, workers=args.jobs, model=args.model, metric=args.metric)
+    if args.report == "json":
+        print(report.to_json())
+    elif args.report == "csv":
+        sys.stdout.write(report.to_csv())
+    else:
+        print(report.to_csv().replace(",", "\t"), end="")
+        print(f"best: {report.best}")
+    if not args.quiet:
+        seconds = time.perf_counter() - start
+        print(f"records: {report.records}  time: {seconds:.2f}s", file=sys.stderr)
+    return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="toon", description="Encode, decode and compare TOON data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("files", nargs="*", help="input files (default: stdin)")
+        sub.add_argument("-j", "--jobs", type=int, default=1, help="worker processes for multiple files")
+        sub.add_argument("-q", "--quiet", action="store_true", help="skip statistics on stderr")
+
+    encode = commands.add_parser("encode", help="convert JSON, JSONL, CSV or YAML to TOON")
+    add_common(encode)
+    encode.add_argument("--from", dest="source_format", choices=_SOURCE_FORMATS, default="auto")
+    encode.add_argument("-o", "--output-dir", help="write <name>.toon files here instead of stdout")
+
+    decode = commands.add_parser("decode", help="convert TOON to another format")
+    add_common(decode)
+    decode.add_argument("--to", dest="target_format", choices=_TARGET_FORMATS[1:], default="json")
+    decode.add_argument("-o", "--output-dir", help="write converted files here instead of stdout")
+
+    convert = commands.add_parser("convert", help="convert between any two formats")
+    add_common(convert)
+    convert.add_argument("--from", dest="source_format", choices=_SOURCE_FORMATS, default="auto")
+    convert.add_argument("--to", dest="target_format", choices=_TARGET_FORMATS, required=True)
+    convert.add_argument("-o", "--output-dir", help="write converted files here instead of stdout")
+
+    compare = commands.add_parser("compare", help="compare format costs over files or stdin")
+    add_common(compare)
+    compare.add_argument("--from", dest="source_format", choices=_SOURCE_FORMATS, default="auto")
+    compare.add_argument("--formats", default="toon,json,yaml", help="comma-separated candidate formats")
+    compare.add_argument("--model", help="tokenizer model for counting")
+    compare.add_argument("--metric", choices=("tokens", "chars"), default="tokens")
+    compare.add_argument("--report", choices=("text", "json", "csv"), default="text")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Entry point for the `toon` console script."""
+    args = _build_parser().parse_args(argv)
+    try:
+        if args.command == "compare":
+            return _compare_command(args)
+        return _convert_command(args)
+    except (OSError, ValueError) as exc:
+        print(f"toon: error: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,19 +2,39 @@
 
 from __future__ import annotations
 
+import csv
+import io
 import json
-from typing import Any
+import os
+import random
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator
 
-from encoder import encode
-from tokens import count_tokens
+from decoder import _DICT_PREAMBLE_RE, _csv_reader, _csv_records, _DecodeContext, _parse_array, decode
+from encoder import encode, normalize_value
+from formats import encode_as
+from tokens import count_tokens_many
 
+# Records per task sent to a worker; each task is counted in one batch.
+_CORPUS_CHUNK_SIZE = 64
+# Per-format reservoir size used for percentiles.
+_REPORT_SAMPLE_SIZE = 2048
+_PERCENTILES = (50, 90, 99)
+# Characters read at a time from JSON corpus files.
+_JSON_CHUNK = 1 << 16
+_JSON_WS_RE = re.compile(r"\s*")
+_JSON_DECODER = json.JSONDecoder()
+_FILE_FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "json", ".csv": "csv"}
 
-def estimate_savings(value: Any) -> dict:
-    """Estimate token savings comparing JSON vs TOON."""
+
+def estimate_savings(value: Any, model: str | None = None) -> dict:
+    """Estimate token savings comparing JSON vs TOON for `model`'s tokenizer."""
     json_str = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
     toon_str = encode(value)
-    json_tokens = count_tokens(json_str)
-    toon_tokens = count_tokens(toon_str)
+    json_tokens, toon_tokens = count_tokens_many([json_str, toon_str], [model])[model]
     savings = 0.0
     if json_tokens:
         savings = (json_tokens - toon_tokens) / json_tokens * 100
@@ -25,12 +45,39 @@ def estimate_savings(value: Any) -> dict:
     }
 
 
-def compare_formats(value: Any) -> str:
+def dedupe_savings(value: Any, options: dict | None = None, model: str | None = None) -> dict:
+    """Report what the `dedupe_strings` encode option saves for `value`.
+
+    Args:
+        value: Python value to encode.
+        options: Encode options; `dedupe_strings` is forced on.
+        model: Model whose tokenizer to count with.
+
+    Returns:
+        Dict with the number of dictionary strings, token counts with and
+        without the dictionary, and the tokens saved.
+    """
+    plain = encode(value, {**(options or {}), "dedupe_strings": False})
+    deduped = encode(value, {**(options or {}), "dedupe_strings": True})
+    plain_tokens, dedupe_tokens = count_tokens_many([plain, deduped], [model])[model]
+    strings = 0
+    preamble = _DICT_PREAMBLE_RE.match(deduped)
+    if preamble is not None:
+        items, _ = _parse_array(deduped, preamble.end() - 1, _DecodeContext())
+        strings = len(items)
+    return {
+        "strings": strings,
+        "toon_tokens": plain_tokens,
+        "dedupe_tokens": dedupe_tokens,
+        "saved_tokens": plain_tokens - dedupe_tokens,
+    }
+
+
+def compare_formats(value: Any, model: str | None = None) -> str:
     """Return a formatted comparison table for JSON and TOON."""
     json_str = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
     toon_str = encode(value)
-    json_tokens = count_tokens(json_str)
-    toon_tokens = count_tokens(toon_str)
+    json_tokens, toon_tokens = count_tokens_many([json_str, toon_str], [model])[model]
     json_size = len(json_str)
     toon_size = len(toon_str)
     savings_tokens = json_tokens - toon_tokens
@@ -47,3 +94,264 @@ def compare_formats(value: Any) -> str:
         f"Savings: {savings_tokens} tokens ({savings_pct:.1f}%)",
     ]
     return "\n".join(lines)
+
+
+class CorpusReport:
+    """Aggregated per-format costs over a corpus, built by `compare_corpus`.
+
+    Memory is bounded: totals and win counts are running sums, and
+    percentiles come from a fixed-size reservoir sample per format.
+
+    Attributes:
+        formats: Candidate formats, in tie-break order.
+        records: Number of records seen.
+        totals: Format -> summed cost over the records it could encode.
+        counts: Format -> number of records it could encode.
+        wins: Format -> number of records where it was cheapest.
+    """
+
+    __slots__ = ("formats", "records", "totals", "counts", "wins", "sample_size", "_samples", "_rng")
+
+    def __init__(self, formats: Iterable[str], sample_size: int = _REPORT_SAMPLE_SIZE, seed: int = 0):
+        self.formats = list(formats)
+        self.records = 0
+        self.totals = dict.fromkeys(self.formats, 0)
+        self.counts = dict.fromkeys(self.formats, 0)
+        self.wins = dict.fromkeys(self.formats, 0)
+        self.sample_size = sample_size
+        self._samples: dict[str, list[int]] = {fmt: [] for fmt in self.formats}
+        self._rng = random.Random(seed)
+
+    def add(self, scores: dict[str, int]) -> None:
+        """Record the per-format costs of one record (formats it could not encode omitted)."""
+        self.records += 1
+        best = None
+        for fmt in self.formats:
+            score = scores.get(fmt)
+            if score is None:
+                continue
+            self.totals[fmt] += score
+            self.counts[fmt] += 1
+            sample = self._samples[fmt]
+            if len(sample) < self.sample_size:
+                sample.append(score)
+            else:
+                slot = self._rng.randrange(self.counts[fmt])
+                if slot < self.sample_size:
+                    sample[slot] = score
+            if best is None or score < scores[best]:
+                best = fmt
+        if best is not None:
+            self.wins[best] += 1
+
+    def percentile(self, fmt: str, q: float) -> int | None:
+        """Return the nearest-rank `q`th percentile cost of `fmt` (estimated past the sample size)."""
+        sample = sorted(self._samples[fmt])
+        if not sample:
+            return None
+        rank = max(0, min(len(sample) - 1, -(-len(sample) * q // 100) - 1))
+        return sample[int(rank)]
+
+    @property
+    def best(self) -> str | None:
+        """Cheapest format in total among those that encoded every record."""
+        complete = [fmt for fmt in self.formats if self.counts[fmt] == self.records and self.records]
+        return min(complete, key=lambda fmt: self.totals[fmt], default=None)
+
+    def to_dict(self) -> dict:
+        formats = {}
+        for fmt in self.formats:
+            count = self.counts[fmt]
+            formats[fmt] = {
+                "records": count,
+                "total": self.totals[fmt],
+                "mean": round(self.totals[fmt] / count, 2) if count else None,
+                **{f"p{q}": self.percentile(fmt, q) for q in _PERCENTILES},
+                "wins": self.wins[fmt],
+            }
+        return {"records": self.records, "best": self.best, "formats": formats}
+
+    def to_json(self, indent: int | None = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_csv(self) -> str:
+        """Return one CSV row per format."""
+        out = io.StringIO()
+        columns = ["records", "total", "mean", *(f"p{q}" for q in _PERCENTILES), "wins"]
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow(["format", *columns])
+        for fmt, stats in self.to_dict()["formats"].items():
+            writer.writerow([fmt, *("" if stats[c] is None else stats[c] for c in columns)])
+        return out.getvalue()
+
+    def __repr__(self) -> str:
+        return f"CorpusReport(records={self.records}, best={self.best!r})"
+
+
+def _iter_json(fp: Any) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time (or the single top-level value).
+
+    The array is read in chunks; only the element being decoded is held in
+    memory, plus one chunk.
+    """
+    buf = fp.read(_JSON_CHUNK)
+    pos = _JSON_WS_RE.match(buf).end()
+    if buf[pos : pos + 1] != "[":
+        yield json.loads(buf + fp.read())
+        return
+    pos += 1
+    eof = False
+    after_item = False
+    while True:
+        pos = _JSON_WS_RE.match(buf, pos).end()
+        if pos < len(buf):
+            ch = buf[pos]
+            if ch == "]":
+                return
+            if after_item:
+                if ch != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {ch!r}")
+                pos += 1
+                after_item = False
+                continue
+            try:
+                value, end = _JSON_DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A number at the end of the buffer may continue in the next chunk.
+                if end < len(buf) or eof:
+                    yield value
+                    pos = end
+                    after_item = True
+                    continue
+        elif eof:
+            raise ValueError("Unterminated JSON array")
+        # Grow reads with the pending text, so a large element is re-parsed only a few times.
+        chunk = fp.read(max(_JSON_CHUNK, len(buf) - pos))
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+
+def _iter_stream(fp: Any, source_format: str) -> Iterator[Any]:
+    """Yield the records of a text stream in `source_format`.
+
+    JSON Lines yield one record per line, JSON arrays one per element and
+    CSV one per row, all streamed. Other formats (or `auto`) are decoded
+    whole; a top-level list yields its items.
+    """
+    if source_format == "jsonl":
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+    elif source_format == "json":
+        yield from _iter_json(fp)
+    elif source_format == "csv":
+        parsed = _csv_reader(fp, {})
+        if parsed is not None:
+            yield from _csv_records(*parsed)
+    else:
+        # Local import to avoid circular dependency on convert -> formats.
+        from convert import _decode_as
+
+        value = _decode_as(fp.read(), source_format)
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
+
+
+def _iter_file(path: str | os.PathLike) -> Iterator[Any]:
+    """Yield the records of a corpus file, by its suffix (see `_iter_stream`)."""
+    suffix = os.path.splitext(os.fspath(path))[1].lower()
+    source_format = _FILE_FORMATS.get(suffix, "auto")
+    with open(path, encoding="utf-8", newline="" if source_format == "csv" else None) as fp:
+        yield from _iter_stream(fp, source_format)
+
+
+def _iter_records(source: Any) -> Iterator[Any]:
+    if isinstance(source, (str, os.PathLike)):
+        yield from _iter_file(source)
+        return
+    for item in source:
+        if isinstance(item, os.PathLike):
+            yield from _iter_file(item)
+        else:
+            yield item
+
+
+def _score_chunk(records: list[Any], formats: list[str], model: str | None, metric: str) -> list[dict[str, int]]:
+    """Encode every record in every format and count all texts in one batch."""
+    slots: list[dict[str, int]] = []
+    texts: list[str] = []
+    for record in records:
+        record = normalize_value(record)
+        slot = {}
+        for fmt in formats:
+            try:
+                text = encode_as(record, fmt)
+            except ValueError:
+                continue
+            slot[fmt] = len(texts)
+            texts.append(text)
+        slots.append(slot)
+    if metric == "tokens":
+        costs = count_tokens_many(texts, [model])[model]
+    else:
+        costs = [len(text) for text in texts]
+    return [{fmt: costs[i] for fmt, i in slot.items()} for slot in slots]
+
+
+def _score_chunks(chunks: Iterator[list[Any]], args: tuple, workers: int | None) -> Iterator[list[dict[str, int]]]:
+    if not workers or workers <= 1:
+        for chunk in chunks:
+            yield _score_chunk(chunk, *args)
+        return
+    with ProcessPoolExecutor(workers) as pool:
+        # Keep a bounded number of chunks in flight so the corpus is never
+        # read ahead of the workers.
+        pending: deque = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def compare_corpus(
+    source: Any,
+    formats: Iterable[str] = ("toon", "json", "yaml"),
+    workers: int | None = None,
+    model: str | None = None,
+    metric: str = "tokens",
+) -> CorpusReport:
+    """Compare candidate formats over a whole corpus of records.
+
+    Records are streamed, encoded in every format and counted per chunk,
+    optionally across a process pool, and folded into a `CorpusReport`.
+    Memory stays bounded by the chunks in flight and the report's samples.
+
+    Args:
+        source: A file path, or an iterable of records and/or `os.PathLike`
+            paths. `.jsonl`/`.ndjson` lines, `.json` array elements and
+            `.csv` rows are streamed as separate records; other files are
+            decoded whole and a top-level list yields its items.
+        formats: Candidate formats for `encode_as`. Records a format cannot
+            encode (e.g. `csv` for non-tabular data) are skipped for it.
+        workers: Worker processes; None or 1 runs in-process.
+        model: Tokenizer model passed to `count_tokens_many`.
+        metric: `tokens` or `chars`.
+
+    Returns:
+        `CorpusReport` with totals, percentiles and win counts per format.
+    """
+    formats = [fmt.lower() for fmt in formats]
+    report = CorpusReport(formats)
+    records = _iter_records(source)
+    chunks = iter(lambda: list(islice(records, _CORPUS_CHUNK_SIZE)), [])
+    for scores in _score_chunks(chunks, (formats, model, metric), workers):
+        for record_scores in scores:
+            report.add(record_scores)
+    return report
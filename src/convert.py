@@ -2,13 +2,266 @@
 
 from __future__ import annotations
 
-from typing import Any
+import csv
+import io
+import json
+import re
+import tempfile
+from itertools import islice
+from typing import IO, Any, Iterable, Iterator
 
-from decoder import decode
+from decoder import (
+    _SCHEMA_DEF_RE,
+    _SCHEMA_PREAMBLE_RE,
+    _parse_primitive,
+    _parse_toon,
+    _parse_yaml,
+    _split_csv_segment,
+    _table_header,
+    _table_row,
+    decode,
+    decode_csv,
+)
+from encoder import (
+    _ROW_CHUNK,
+    _collect_columns,
+    _encode,
+    _encode_column,
+    _encode_primitive,
+    _encode_rows,
+    normalize_value,
+)
 from formats import encode_as
 
+_CHUNK_SIZE = 1 << 16
+# Spooled JSON Lines stay in memory up to this size, then move to a temp file.
+_SPOOL_SIZE = 1 << 20
+
+_CSV_TABLE_RE = re.compile(r"\s*\^\s*csv\s*\[", re.IGNORECASE)
+_SPECIAL_RE = re.compile(r"[\\\"|\]]")
+_QUOTED_SPECIAL_RE = re.compile(r"[\\\"]")
+# Inputs that legitimately decode to an empty value (whitespace removed).
+_EMPTY_INPUTS = {"", "{}", "[]", "null", "^csv[]"}
+
 
 def convert_format(input_str: str, target_format: str) -> str:
     """Decode input (auto-detect) and re-encode into target format."""
     value = decode(input_str)
     return encode_as(value, target_format)
+
+
+def _csv_to_toon(source: IO[str], target: IO[str]) -> int:
+    reader = csv.reader(source)
+    header = next(reader, None)
+    count = 0
+    for row in reader:
+        if not row:
+            continue
+        row += [""] * (len(header) - len(row))
+        cells = ",".join(_encode_primitive(_parse_primitive(cell)) for cell in row[: len(header)])
+        if count == 0:
+            target.write("^csv[" + ",".join(_encode_column((k,)) for k in header))
+        target.write("|" + cells)
+        count += 1
+    target.write("]" if count else "[]")
+    return count
+
+
+def _iter_jsonl(lines: Iterable[str]) -> Iterator[Any]:
+    for line in lines:
+        if line.strip():
+            yield normalize_value(json.loads(line))
+
+
+def _jsonl_to_toon(source: Iterable[str], target: IO[str]) -> int:
+    # The union of keys is only known once every record has been seen, so
+    # lines are spooled (to disk past _SPOOL_SIZE) and written in a second
+    # pass, either as one `^csv` table or as a plain array. Nested dicts are
+    # flattened into dotted columns, as in `encode`.
+    columns: dict[tuple[Any, ...], None] = {}
+    nested: dict[tuple[Any, ...], bool] = {}
+    tabular = True
+    seen = False
+    count = 0
+    with tempfile.SpooledTemporaryFile(_SPOOL_SIZE, mode="w+", encoding="utf-8") as spool:
+        for line in source:
+            if not line.strip():
+                continue
+            seen = True
+            spool.write(line if line.endswith("\n") else line + "\n")
+            if not tabular:
+                continue
+            record = normalize_value(json.loads(line))
+            if not isinstance(record, dict) or not record:
+                tabular = False
+            elif _collect_columns(record, (), columns, nested, True) is None:
+                tabular = False
+        if not seen:
+            target.write("[]")
+            return 0
+        spool.seek(0)
+        if tabular and columns:
+            paths = list(columns)
+            target.write("^csv[" + ",".join(_encode_column(path) for path in paths))
+            records = _iter_jsonl(spool)
+            while True:
+                chunk = list(islice(records, _ROW_CHUNK))
+                if not chunk:
+                    break
+                for row in _encode_rows(chunk, paths):
+                    target.write("|" + row)
+                count += len(chunk)
+        else:
+            target.write("[")
+            for record in _iter_jsonl(spool):
+                target.write(("|" if count else "") + _encode(record))
+                count += 1
+        target.write("]")
+    return count
+
+
+def encode_jsonl(fp: Iterable[str]) -> str:
+    """Encode JSON Lines records into a single TOON value.
+
+    Records are read in one pass while building the union of their keys in
+    first-seen order. Records become one `^csv` table with empty cells for
+    missing fields, nested dicts flattened into dotted columns as in
+    `encode`; if any record is not a non-empty dict of primitives and
+    nested dicts, the plain array form is used instead. Lines are spooled to a temp file past 1 MB.
+
+    Args:
+        fp: Text file object (or any iterable of lines) with one JSON value per line.
+
+    Returns:
+        TOON string.
+    """
+    out = io.StringIO()
+    _jsonl_to_toon(fp, out)
+    return out.getvalue()
+
+
+def _iter_table_segments(head: str, source: IO[str]) -> Iterator[str]:
+    """Yield `|`-delimited segments of a table body read in chunks, up to its `]`."""
+    parts: list[str] = []
+    in_quotes = False
+    escaped = False
+    chunk = head or source.read(_CHUNK_SIZE)
+    while chunk:
+        pos = 0
+        if escaped:
+            parts.append(chunk[0])
+            pos, escaped = 1, False
+        while True:
+            match = (_QUOTED_SPECIAL_RE if in_quotes else _SPECIAL_RE).search(chunk, pos)
+            if match is None:
+                parts.append(chunk[pos:])
+                break
+            idx = match.start()
+            ch = chunk[idx]
+            if ch == "\\":
+                parts.append(chunk[pos : idx + 2])
+                escaped = idx + 1 >= len(chunk)
+                pos = idx + 2
+                continue
+            if ch == "\"":
+                in_quotes = not in_quotes
+                parts.append(chunk[pos : idx + 1])
+                pos = idx + 1
+                continue
+            parts.append(chunk[pos:idx])
+            segment = "".join(parts)
+            parts = []
+            if ch == "]":
+                if segment:
+                    yield segment
+                return
+            yield segment
+            pos = idx + 1
+        chunk = source.read(_CHUNK_SIZE)
+    if parts:
+        yield "".join(parts)
+
+
+def _toon_to_csv(head: str, source: IO[str], target: IO[str], schema_ids: bool = False) -> int:
+    segments = _iter_table_segments(head, source)
+    header = next(segments, None)
+    if header is None:
+        raise ValueError("CSV requires a list of uniform dict rows")
+    tokens = _split_csv_segment(header)
+    # A schema definition (`^csv[@N,a,b|...]`) names the header; it is not a column.
+    if schema_ids and _SCHEMA_DEF_RE.fullmatch(tokens[0]):
+        tokens = tokens[1:]
+    keys = _table_header(tokens)
+    if any(isinstance(k, tuple) for k in keys):
+        raise ValueError("CSV requires a list of uniform dict rows")
+    count = 0
+    for segment in segments:
+        row = _table_row(keys, _split_csv_segment(segment))
+        if count == 0:
+            target.write(",".join(keys))
+        target.write("\n" + ",".join(str(row.get(k, "")) for k in keys))
+        count += 1
+    if count == 0:
+        raise ValueError("CSV requires a list of uniform dict rows")
+    return count
+
+
+def _decode_as(text: str, source_format: str) -> Any:
+    """Decode `text` as `source_format`; only `auto` detects the format."""
+    if source_format == "json":
+        return json.loads(text)
+    if source_format == "csv":
+        return decode_csv(text)
+    if source_format == "yaml":
+        return _parse_yaml(text)
+    if source_format == "toon":
+        return _parse_toon(text)
+    if source_format != "auto":
+        raise ValueError(f"Unknown source format: {source_format}")
+    value = decode(text)
+    if value in (None, {}, []) and "".join(text.split()) not in _EMPTY_INPUTS:
+        raise ValueError(f"input decoded to {value!r}; pass the source format")
+    return value
+
+
+def convert_stream(source: IO[str], target: IO[str], source_format: str, target_format: str) -> int:
+    """Convert between formats from a readable text stream to a writable one.
+
+    CSV -> TOON, JSON Lines -> TOON and `^csv` TOON table -> CSV are streamed
+    row by row at constant memory. Any other pair (or a TOON input that is not
+    a `^csv` table) is decoded in full as `source_format` and re-encoded
+    with `encode_as`.
+
+    Args:
+        source: Readable text stream.
+        target: Writable text stream.
+        source_format: `csv`, `jsonl`, `toon`, `json`, `yaml`, or `auto` to
+            detect the format of the input.
+        target_format: Any format accepted by `encode_as`.
+
+    Returns:
+        Number of records written.
+
+    Raises:
+        ValueError: If the input is not valid `source_format`, or with
+            `auto`, if non-empty input decodes to an empty value.
+    """
+    source_format = source_format.lower()
+    target_format = target_format.lower()
+    if source_format == "csv" and target_format == "toon":
+        return _csv_to_toon(source, target)
+    if source_format == "jsonl" and target_format == "toon":
+        return _jsonl_to_toon(source, target)
+    head = ""
+    if source_format == "toon" and target_format == "csv":
+        head = source.read(_CHUNK_SIZE)
+        marker = _SCHEMA_PREAMBLE_RE.match(head)
+        match = _CSV_TABLE_RE.match(head, 0 if marker is None else marker.end())
+        if match is not None:
+            return _toon_to_csv(head[match.end() :], source, target, marker is not None)
+    if source_format == "jsonl":
+        value: Any = list(_iter_jsonl(source))
+    else:
+        value = _decode_as(head + source.read(), source_format)
+    target.write(encode_as(value, target_format))
+    return len(value) if isinstance(value, list) else 1
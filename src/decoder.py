@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import csv
+import io
 import json
 import re
-from typing import Any
+from itertools import chain, islice
+from typing import IO, Any, Callable, Iterable, Iterator
 
 from detect import detect_format
 
@@ -14,6 +16,114 @@ _FLOAT_RE = re.compile(r"^[+-]?(?:\d+\.?\d*|\d*\.\d+)(?:[eE][+-]?\d+)?$")
 
 _STOP_CHARS = {"{", "}", "[", "]", "|", ",", "^"}
 
+_JSON_DECODER = json.JSONDecoder()
+
+# Rows read up front to infer CSV column types.
+_CSV_SAMPLE_ROWS = 100
+
+_SCHEMA_REF_RE = re.compile(r"@(\d+)\s*")
+_SCHEMA_DEF_RE = re.compile(r"\s*@(\d+)\s*")
+_STRING_REF_RE = re.compile(r"@(\d+)")
+_DICT_PREAMBLE_RE = re.compile(r"\s*\^\s*dict\s*\[", re.IGNORECASE)
+# Marks a document written with a schema registry; only then are leading `@N` header tokens schema IDs.
+_SCHEMA_PREAMBLE_RE = re.compile(r"\s*\^\s*schema", re.IGNORECASE)
+
+# Default bounds of an `InternTable`: distinct strings kept, and the longest string considered.
+_INTERN_MAX_SIZE = 1 << 16
+_INTERN_MAX_LENGTH = 32
+
+
+class InternTable:
+    """Bounded table that maps decoded string values to one shared instance.
+
+    Repeated short values (enum-like cells such as `active` or `US`) then
+    share a single `str` instead of one copy per occurrence. Strings longer
+    than `max_length` are passed through; once `max_size` strings are held,
+    new ones are passed through too, so the table never grows past its
+    bound. A table can be shared across decodes via the `intern_values`
+    option.
+    """
+
+    __slots__ = ("max_size", "max_length", "_strings")
+
+    def __init__(self, max_size: int = _INTERN_MAX_SIZE, max_length: int = _INTERN_MAX_LENGTH):
+        self.max_size = max_size
+        self.max_length = max_length
+        self._strings: dict[str, str] = {}
+
+    def intern(self, text: str) -> str:
+        """Return the shared instance equal to `text`, adding it if there is room."""
+        if len(text) > self.max_length:
+            return text
+        shared = self._strings.get(text)
+        if shared is not None:
+            return shared
+        if len(self._strings) < self.max_size:
+            self._strings[text] = text
+        return text
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+def _intern_table(options: dict | None) -> InternTable | None:
+    """Return the value intern table selected by the `intern_values` option."""
+    table = options.get("intern_values") if options else None
+    if table is True:
+        return InternTable()
+    if table is None or table is False:
+        return None
+    return table
+
+
+def _intern_value(value: Any, values: InternTable | None) -> Any:
+    if values is not None and type(value) is str:
+        return values.intern(value)
+    return value
+
+
+class _DecodeContext:
+    """Per-decode state: schema definitions seen so far, an optional shared
+    registry, the `^dict` string dictionary, if the input has one, and the
+    optional value intern table.
+
+    `schema_ids` is set when `@N` header tokens are schema IDs: with a
+    registry or after a `^schema` preamble. Otherwise they are plain keys,
+    as written before schema references existed.
+
+    Keys are shared through `values` when given, else through a dict that
+    lives as long as the decode (never `sys.intern`, whose strings are
+    immortal and would leak on high-cardinality input)."""
+
+    __slots__ = ("registry", "schema_ids", "schemas", "strings", "values", "keys")
+
+    def __init__(self, registry: Any = None, values: InternTable | None = None, schema_ids: bool = False):
+        self.registry = registry
+        self.schema_ids = schema_ids or registry is not None
+        self.schemas: dict[int, list[Any]] = {}
+        self.strings: list[str] | None = None
+        self.values = values
+        self.keys: dict[str, str] = {}
+
+    def key(self, text: str) -> str:
+        """Return the shared instance of key `text` for this decode."""
+        if self.values is not None:
+            return self.values.intern(text)
+        return self.keys.setdefault(text, text)
+
+    def resolve(self, schema_id: int) -> list[Any]:
+        keys = self.schemas.get(schema_id)
+        if keys is not None:
+            return keys
+        if self.registry is None:
+            raise ValueError(f"Unknown schema id: {schema_id} (pass a schema_registry)")
+        return list(self.registry.resolve(schema_id))
+
+    def define(self, schema_id: int, keys: list[Any]) -> None:
+        self.schemas[schema_id] = keys
+        if self.registry is not None:
+            self.registry.define(schema_id, keys)
+
 
 def _unescape_string(text: str) -> str:
     result = []
@@ -66,6 +176,17 @@ def _parse_primitive(token: str) -> Any:
     return token
 
 
+def _resolve_string(token: str, strings: list[str]) -> Any:
+    """Expand an unquoted `@N` token through the string dictionary."""
+    ref = _STRING_REF_RE.fullmatch(token.strip())
+    if ref is None:
+        return _parse_primitive(token)
+    pos = int(ref.group(1))
+    if pos >= len(strings):
+        raise ValueError(f"Unknown string reference: @{pos}")
+    return strings[pos]
+
+
 def _skip_ws(text: str, idx: int) -> int:
     while idx < len(text) and text[idx].isspace():
         idx += 1
@@ -157,47 +278,61 @@ def _read_segment(text: str, idx: int) -> tuple[str, int]:
     return "".join(buf), idx
 
 
-def _parse_value(text: str, idx: int) -> tuple[Any, int]:
+def _parse_value(text: str, idx: int, ctx: _DecodeContext | None = None) -> tuple[Any, int]:
+    if ctx is None:
+        ctx = _DecodeContext()
     idx = _skip_ws(text, idx)
     if idx >= len(text):
         return None, idx
     ch = text[idx]
     if ch == "{":
-        return _parse_object(text, idx)
+        return _parse_object(text, idx, ctx)
     if ch == "[":
-        return _parse_array(text, idx)
+        return _parse_array(text, idx, ctx)
     if ch == "^":
-        return _parse_table(text, idx)
+        return _parse_table(text, idx, ctx)
     if ch == "\"":
         value, idx = _parse_quoted(text, idx)
-        return value, idx
+        return _intern_value(value, ctx.values), idx
     token, idx = _parse_token(text, idx, _STOP_CHARS)
-    return _parse_primitive(token), idx
+    if ctx.strings is not None:
+        return _resolve_string(token, ctx.strings), idx
+    return _intern_value(_parse_primitive(token), ctx.values), idx
 
 
-def _parse_object(text: str, idx: int) -> tuple[dict[str, Any], int]:
+def _parse_object(text: str, idx: int, ctx: _DecodeContext) -> tuple[dict[str, Any], int]:
     obj: dict[str, Any] = {}
     idx += 1
     idx = _skip_ws(text, idx)
     if idx < len(text) and text[idx] == "}":
         return obj, idx + 1
-    keys = []
-    while idx < len(text):
-        key, idx = _parse_token(text, idx, {",", "|", "}"})
-        keys.append(str(key))
-        idx = _skip_ws(text, idx)
-        if idx >= len(text):
-            break
-        if text[idx] == ",":
-            idx += 1
-            continue
-        if text[idx] == "|":
-            idx += 1
-            break
-        if text[idx] == "}":
-            return obj, idx + 1
+    schema_id = None
+    ref = _SCHEMA_REF_RE.match(text, idx) if ctx.schema_ids else None
+    if ref is not None and text[ref.end() : ref.end() + 1] in {",", "|"}:
+        schema_id = int(ref.group(1))
+        idx = ref.end() + 1
+    if schema_id is not None and text[idx - 1] == "|":
+        keys = ctx.resolve(schema_id)
+    else:
+        keys = []
+        while idx < len(text):
+            key, idx = _parse_token(text, idx, {",", "|", "}"})
+            keys.append(ctx.key(str(key)))
+            idx = _skip_ws(text, idx)
+            if idx >= len(text):
+                break
+            if text[idx] == ",":
+                idx += 1
+                continue
+            if text[idx] == "|":
+                idx += 1
+                break
+            if text[idx] == "}":
+                return obj, idx + 1
+        if schema_id is not None:
+            ctx.define(schema_id, keys)
     for key in keys:
-        value, idx = _parse_value(text, idx)
+        value, idx = _parse_value(text, idx, ctx)
         obj[key] = value
         idx = _skip_ws(text, idx)
         if idx >= len(text):
@@ -210,14 +345,14 @@ def _parse_object(text: str, idx: int) -> tuple[dict[str, Any], int]:
     return obj, idx
 
 
-def _parse_array(text: str, idx: int) -> tuple[list[Any], int]:
+def _parse_array(text: str, idx: int, ctx: _DecodeContext) -> tuple[list[Any], int]:
     items: list[Any] = []
     idx += 1
     idx = _skip_ws(text, idx)
     if idx < len(text) and text[idx] == "]":
         return items, idx + 1
     while idx < len(text):
-        value, idx = _parse_value(text, idx)
+        value, idx = _parse_value(text, idx, ctx)
         items.append(value)
         idx = _skip_ws(text, idx)
         if idx >= len(text):
@@ -230,9 +365,77 @@ def _parse_array(text: str, idx: int) -> tuple[list[Any], int]:
     return items, idx
 
 
-def _parse_table(text: str, idx: int) -> tuple[list[dict[str, Any]], int]:
+def _table_header(tokens: list[str], ctx: _DecodeContext | None = None) -> list[Any]:
+    """Parse `^csv` header cells; unquoted dotted names become nested key paths.
+
+    With `ctx`, keys are shared with the rest of that decode.
+    """
+    keys: list[Any] = []
+    for tok in tokens:
+        key = str(_parse_primitive(tok))
+        if "." in key and not tok.strip().startswith("\""):
+            parts = key.split(".")
+            keys.append(tuple(parts if ctx is None else map(ctx.key, parts)))
+        else:
+            keys.append(key if ctx is None else ctx.key(key))
+    return keys
+
+
+def _table_row(
+    keys: list[Any],
+    tokens: list[str],
+    strings: list[str] | None = None,
+    values: InternTable | None = None,
+) -> dict[str, Any]:
+    row: dict[str, Any] = {}
+    for key, tok in zip(keys, tokens):
+        # An empty cell marks a key that is absent from the row.
+        if tok.strip() == "":
+            continue
+        if strings is None:
+            value = _intern_value(_parse_primitive(tok), values)
+        else:
+            value = _resolve_string(tok, strings)
+        if isinstance(key, tuple):
+            target = row
+            for part in key[:-1]:
+                target = target.setdefault(part, {})
+            target[key[-1]] = value
+        else:
+            row[key] = value
+    return row
+
+
+def _parse_csv_rows(text: str, idx: int, keys: list[Any], ctx: _DecodeContext) -> tuple[list[dict[str, Any]], int]:
+    rows: list[dict[str, Any]] = []
+    while idx < len(text):
+        row_segment, idx = _read_segment(text, idx)
+        if row_segment == "" and idx < len(text) and text[idx] == "]":
+            return rows, idx + 1
+        rows.append(_table_row(keys, _split_csv_segment(row_segment), ctx.strings, ctx.values))
+        if idx >= len(text):
+            break
+        if text[idx] == "|":
+            idx += 1
+            continue
+        if text[idx] == "]":
+            return rows, idx + 1
+    return rows, idx
+
+
+def _parse_table(text: str, idx: int, ctx: _DecodeContext) -> tuple[Any, int]:
     idx += 1
     idx = _skip_ws(text, idx)
+    if text[idx : idx + 4].lower() == "json":
+        # Inline JSON fragment written by hybrid mode.
+        return _JSON_DECODER.raw_decode(text, _skip_ws(text, idx + 4))
+    ref = _SCHEMA_REF_RE.match(text, idx)
+    if ref is not None:
+        idx = ref.end()
+        if idx >= len(text) or text[idx] != "[":
+            raise ValueError("Invalid table rows")
+        keys = ctx.resolve(int(ref.group(1)))
+        return _parse_csv_rows(text, _skip_ws(text, idx + 1), keys, ctx)
     if text[idx : idx + 3].lower() == "csv":
         idx += 3
         idx = _skip_ws(text, idx)
@@ -240,31 +443,20 @@ def _parse_table(text: str, idx: int) -> tuple[list[dict[str, Any]], int]:
             raise ValueError("Invalid csv table rows")
         idx += 1
         idx = _skip_ws(text, idx)
-        rows: list[dict[str, Any]] = []
         if idx < len(text) and text[idx] == "]":
-            return rows, idx + 1
+            return [], idx + 1
         header_segment, idx = _read_segment(text, idx)
-        keys = [str(_parse_primitive(tok)) for tok in _split_csv_segment(header_segment)]
+        tokens = _split_csv_segment(header_segment)
+        definition = _SCHEMA_DEF_RE.fullmatch(tokens[0]) if ctx.schema_ids else None
+        keys = _table_header(tokens[1:] if definition else tokens, ctx)
+        if definition:
+            ctx.define(int(definition.group(1)), keys)
         if idx < len(text) and text[idx] == "|":
             idx += 1
-        while idx < len(text):
-            row_segment, idx = _read_segment(text, idx)
-            if row_segment == "" and idx < len(text) and text[idx] == "]":
-                return rows, idx + 1
-            row_tokens = _split_csv_segment(row_segment)
-            row_values = [_parse_primitive(tok) for tok in row_tokens]
-            rows.append({k: v for k, v in zip(keys, row_values)})
-            if idx >= len(text):
-                break
-            if text[idx] == "|":
-                idx += 1
-                continue
-            if text[idx] == "]":
-                return rows, idx + 1
-        return rows, idx
+        return _parse_csv_rows(text, idx, keys, ctx)
     if idx >= len(text) or text[idx] != "{":
         raise ValueError("Invalid table header")
-    keys, idx = _parse_keys(text, idx)
+    keys, idx = _parse_keys(text, idx, ctx)
     idx = _skip_ws(text, idx)
     if idx >= len(text) or text[idx] != "[":
         raise ValueError("Invalid table rows")
@@ -277,7 +469,7 @@ def _parse_table(text: str, idx: int) -> tuple[list[dict[str, Any]], int]:
         row = []
         while idx < len(text):
             token, idx = _parse_token(text, idx, {",", "|", "]"})
-            row.append(_parse_primitive(token))
+            row.append(_intern_value(_parse_primitive(token), ctx.values))
             idx = _skip_ws(text, idx)
             if idx >= len(text) or text[idx] in {"|", "]"}:
                 break
@@ -295,7 +487,7 @@ def _parse_table(text: str, idx: int) -> tuple[list[dict[str, Any]], int]:
     return rows, idx
 
 
-def _parse_keys(text: str, idx: int) -> tuple[list[str], int]:
+def _parse_keys(text: str, idx: int, ctx: _DecodeContext | None = None) -> tuple[list[str], int]:
     keys = []
     idx += 1
     idx = _skip_ws(text, idx)
@@ -303,7 +495,7 @@ def _parse_keys(text: str, idx: int) -> tuple[list[str], int]:
         return keys, idx + 1
     while idx < len(text):
         key, idx = _parse_token(text, idx, {",", "}"})
-        keys.append(str(key))
+        keys.append(str(key) if ctx is None else ctx.key(str(key)))
         idx = _skip_ws(text, idx)
         if idx >= len(text):
             break
@@ -315,28 +507,152 @@ def _parse_keys(text: str, idx: int) -> tuple[list[str], int]:
     return keys, idx
 
 
-def _parse_toon(text: str) -> Any:
-    value, _ = _parse_value(text, 0)
+def _parse_toon(text: str, ctx: _DecodeContext | None = None) -> Any:
+    if ctx is None:
+        ctx = _DecodeContext()
+    idx = 0
+    marker = _SCHEMA_PREAMBLE_RE.match(text)
+    if marker is not None:
+        ctx.schema_ids = True
+        idx = marker.end()
+    preamble = _DICT_PREAMBLE_RE.match(text, idx)
+    if preamble is not None:
+        # `^dict[s0|s1|...]` lists the strings that `@N` values refer to.
+        strings, idx = _parse_array(text, preamble.end() - 1, ctx)
+        ctx.strings = [str(item) for item in strings]
+    value, _ = _parse_value(text, idx, ctx)
     return value
 
 
-def _parse_csv(text: str) -> Any:
-    reader = csv.reader(text.splitlines())
-    rows = list(reader)
-    if not rows:
-        return []
-    header = rows[0]
-    data = []
-    for row in rows[1:]:
-        item = {}
-        for key, value in zip(header, row):
-            item[key] = _parse_primitive(value)
-        data.append(item)
-    return data
+def _csv_int(tok: str) -> Any:
+    if "_" not in tok:
+        try:
+            return int(tok)
+        except ValueError:
+            pass
+    return _parse_primitive(tok)
+
+
+def _csv_float(tok: str) -> Any:
+    if "_" not in tok:
+        try:
+            value = float(tok)
+        except ValueError:
+            pass
+        else:
+            # float() also accepts nan/inf spellings that decode as text.
+            if value - value == 0:
+                return value
+    return _parse_primitive(tok)
+
+
+def _csv_bool(tok: str) -> Any:
+    lowered = tok.strip().lower()
+    if lowered == "true":
+        return True
+    if lowered == "false":
+        return False
+    return _parse_primitive(tok)
+
+
+def _csv_text(tok: str) -> Any:
+    return None if tok.lower() == "null" else tok
+
+
+def _csv_column_type(tokens: Iterable[str]) -> Callable[[str], Any]:
+    """Pick the converter for a column from its sampled cells.
+
+    Empty and null cells are ignored. Text columns keep later cells as text
+    (except `null`); mixed columns, and any cell a typed converter rejects,
+    use `_parse_primitive`.
+    """
+    kinds = set()
+    for tok in tokens:
+        if tok == "":
+            continue
+        value = _parse_primitive(tok)
+        if value is None:
+            continue
+        if isinstance(value, str) and value != tok:
+            return _parse_primitive
+        kinds.add(type(value))
+    if len(kinds) != 1:
+        return _parse_primitive
+    kind = kinds.pop()
+    if kind is int:
+        return _csv_int
+    if kind is float:
+        return _csv_float
+    if kind is bool:
+        return _csv_bool
+    return _csv_text
+
+
+def _interning(convert: Callable[[str], Any], values: InternTable) -> Callable[[str], Any]:
+    def convert_interned(tok: str) -> Any:
+        return _intern_value(convert(tok), values)
+
+    return convert_interned
+
+
+def decode_csv(source: str | IO[str] | Iterable[str], options: dict | None = None) -> Any:
+    """Decode CSV with a header row into typed rows.
+
+    Rows are read lazily from `csv.reader`; column types are inferred from
+    the first `sample_rows` rows and each cell is converted with its
+    column's converter, so the only extra memory is the sample.
+
+    Args:
+        source: CSV text, a text file object or any iterable of lines.
+        options: Optional settings:
+            columnar: Return `{column: [values...]}` instead of a list of
+                row dicts; short rows are padded with None (default False).
+            sample_rows: Rows used for type inference (default 100).
+            intern_values: True, or a shared `InternTable`, to share one
+                `str` between equal short text cells (default False).
+
+    Returns:
+        List of row dicts, or a dict of column lists.
+    """
+    options = options or {}
+    columnar = options.get("columnar", False)
+    parsed = _csv_reader(source, options)
+    if parsed is None:
+        return {} if columnar else []
+    header, converters, rows = parsed
+    if columnar:
+        columns: list[list[Any]] = [[] for _ in header]
+        for row in rows:
+            for i, convert in enumerate(converters):
+                columns[i].append(convert(row[i]) if i < len(row) else None)
+        return dict(zip(header, columns))
+    return list(_csv_records(header, converters, rows))
+
+
+def _csv_reader(
+    source: str | IO[str] | Iterable[str], options: dict
+) -> tuple[list[str], list[Callable[[str], Any]], Iterator[list[str]]] | None:
+    """Return (header, column converters, raw rows) for CSV input, or None if it is empty."""
+    if isinstance(source, str):
+        source = io.StringIO(source, newline="")
+    reader = csv.reader(source)
+    header = next(reader, None)
+    if header is None:
+        return None
+    sample = list(islice(reader, options.get("sample_rows", _CSV_SAMPLE_ROWS)))
+    converters = [_csv_column_type(row[i] for row in sample if i < len(row)) for i in range(len(header))]
+    values = _intern_table(options)
+    if values is not None:
+        converters = [_interning(convert, values) for convert in converters]
+    return header, converters, chain(sample, reader)
 
 
-def _yaml_indent(line: str) -> int:
-    return len(line) - len(line.lstrip(" "))
+def _csv_records(
+    header: list[str], converters: list[Callable[[str], Any]], rows: Iterable[list[str]]
+) -> Iterator[dict[str, Any]]:
+    pairs = list(zip(header, converters))
+    for row in rows:
+        yield {key: convert(tok) for (key, convert), tok in zip(pairs, row)}
 
 
 def _yaml_parse_inline(token: str) -> Any:
@@ -348,47 +664,70 @@ def _yaml_parse_inline(token: str) -> Any:
     return _parse_primitive(token)
 
 
-def _yaml_parse_node(lines: list[str], idx: int, indent: int) -> tuple[Any, int]:
-    if idx >= len(lines):
-        return None, idx
-    line = lines[idx]
-    if _yaml_indent(line) < indent:
-        return None, idx
-    stripped = line.strip()
-    if stripped.startswith("-"):
-        items: list[Any] = []
-        while idx < len(lines) and _yaml_indent(lines[idx]) == indent:
-            item_line = lines[idx].strip()[1:].lstrip()
-            if item_line == "":
-                idx += 1
-                item, idx = _yaml_parse_node(lines, idx, indent + 2)
-                items.append(item)
-            else:
-                items.append(_yaml_parse_inline(item_line))
-                idx += 1
-        return items, idx
-    if ":" in stripped:
-        obj: dict[str, Any] = {}
-        while idx < len(lines):
-            line = lines[idx]
-            if _yaml_indent(line) < indent:
-                break
-            if _yaml_indent(line) > indent:
+def _yaml_container(content: str) -> list[Any] | dict[str, Any] | None:
+    if content.startswith("-"):
+        return []
+    if ":" in content:
+        return {}
+    return None
+
+
+def _parse_yaml(text: str) -> Any:
+    """Parse the YAML subset written by `to_yaml_simple` in a single pass.
+
+    Open containers are kept on a stack with their indentation. A `key:` or
+    `-` line without an inline value leaves a pending slot that the next,
+    deeper line fills with a nested list, mapping or scalar; if no deeper
+    line follows, the slot stays None.
+    """
+    holder: list[Any] = [None]
+    stack: list[tuple[int, Any]] = []
+    # Repeated keys share one `str` for this parse.
+    keys: dict[str, str] = {}
+    pending: tuple[Any, Any, int] | None = (holder, 0, -1)
+    for line in text.splitlines():
+        content = line.lstrip(" ")
+        if not content or content.isspace():
+            continue
+        indent = len(line) - len(content)
+        if pending is not None and indent > pending[2]:
+            container, key, _ = pending
+            pending = None
+            child = _yaml_container(content)
+            if child is None:
+                container[key] = _yaml_parse_inline(content)
+                continue
+            container[key] = child
+            stack.append((indent, child))
+        else:
+            pending = None
+            while stack and indent < stack[-1][0]:
+                stack.pop()
+            if not stack or indent != stack[-1][0]:
                 break
-            content = line[indent:]
-            if ":" not in content:
+        container = stack[-1][1]
+        if isinstance(container, list):
+            if not content.startswith("-"):
                 break
-            key, rest = content.split(":", 1)
-            key_str = str(_parse_primitive(key.strip()))
-            if rest.strip() == "":
-                idx += 1
-                value, idx = _yaml_parse_node(lines, idx, indent + 2)
-                obj[key_str] = value
+            item = content[1:].strip()
+            if item == "":
+                container.append(None)
+                pending = (container, len(container) - 1, indent)
             else:
-                obj[key_str] = _yaml_parse_inline(rest.strip())
-                idx += 1
-        return obj, idx
-    return _yaml_parse_inline(stripped), idx + 1
+                container.append(_yaml_parse_inline(item))
+            continue
+        key, sep, rest = content.partition(":")
+        if not sep:
+            break
+        key_str = str(_parse_primitive(key.strip()))
+        key_str = keys.setdefault(key_str, key_str)
+        rest = rest.strip()
+        if rest == "":
+            container[key_str] = None
+            pending = (container, key_str, indent)
+        else:
+            container[key_str] = _yaml_parse_inline(rest)
+    return holder[0]
 
 
 def decode(input_str: str, options: dict | None = None) -> Any:
@@ -396,23 +735,26 @@ def decode(input_str: str, options: dict | None = None) -> Any:
 
     Args:
         input_str: Input text.
-        options: Reserved for future compatibility.
+        options: Optional settings:
+            schema_registry: `SchemaRegistry` used to resolve `@N` header
+                references in TOON input; inline definitions are added to it.
+                Without it, `@N` headers are only read as schema IDs after
+                a `^schema` preamble.
+            intern_values: True for a per-decode `InternTable`, or a shared
+                one, so that equal short string values in TOON and CSV input
+                share one `str` (default False). Keys are always shared
+                within a decode, and through the table when one is given.
 
     Returns:
         Decoded Python value.
     """
-    del options
+    registry = options.get("schema_registry") if options else None
+    values = _intern_table(options)
     fmt = detect_format(input_str)
     if fmt == "json":
         return json.loads(input_str)
     if fmt == "csv":
-        return _parse_csv(input_str)
+        return decode_csv(input_str, {"intern_values": values})
     if fmt == "yaml":
-        lines = [line.rstrip("\n") for line in input_str.splitlines() if line.strip() != ""]
-        if not lines:
-            return None
-        value, _ = _yaml_parse_node(lines, 0, 0)
-        return value
-    if fmt == "toon":
-        return _parse_toon(input_str)
-    return _parse_toon(input_str)
+        return _parse_yaml(input_str)
+    return _parse_toon(input_str, _DecodeContext(registry, values))
@@ -5,17 +5,59 @@ Encodes Python values into a compact, deterministic format intended for LLM prom
 
 from __future__ import annotations
 
+import json
 import math
 import re
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any
+from typing import Any, Callable, Iterator
 
 _RESERVED_TOKENS = {"null", "true", "false"}
 
 _NUMERIC_RE = re.compile(r"^[+-]?(?:\d+\.?\d*|\d*\.\d+)(?:[eE][+-]?\d+)?$")
 
+# Bare `@N` tokens in a header are schema references.
+_SCHEMA_REF_RE = re.compile(r"^@\d+$")
+
 _DELIMITERS = {"{", "}", "[", "]", "|", ",", "^", "="}
+# Table cells toggle quoting on a bare `"` and escape on `\`, so both force quotes.
+_QUOTE_CHARS = {"\"", "\\"}
+
+# Maximum fraction of missing cells for a list of dicts to be encoded as a table.
+_DEFAULT_SPARSITY = 0.5
+
+# Float policies: shortest round-trip text, N significant digits, or N decimals.
+_FLOAT_POLICY_RE = re.compile(r"^(?:repr|(sig|fixed):(\d+))$")
+
+# Strings shorter or rarer than this are never considered for the string dictionary.
+_DEFAULT_DEDUPE_MIN_LENGTH = 8
+_DEFAULT_DEDUPE_MIN_COUNT = 2
+
+_DEFAULT_OPTIONS: dict[str, Any] = {
+    "sparsity": _DEFAULT_SPARSITY,
+    "flatten": True,
+    "schema_registry": None,
+    "dedupe_strings": False,
+    "dedupe_min_length": _DEFAULT_DEDUPE_MIN_LENGTH,
+    "dedupe_min_count": _DEFAULT_DEDUPE_MIN_COUNT,
+    "float_format": "repr",
+    # Internal: string -> `@N` reference map chosen by `_string_dictionary`.
+    "_string_refs": None,
+    # Internal: float formatter for values outside per-column policies.
+    "_float": None,
+    # Internal: column name -> float formatter, from a `float_format` dict.
+    "_column_floats": None,
+}
+
+_MISSING = object()
+
+_JSON_PREFIX = "^json"
+
+_DICT_PREFIX = "^dict"
+_SCHEMA_PREFIX = "^schema"
+
+# Table rows encoded per piece by `_iter_encode`.
+_ROW_CHUNK = 1024
 
 
 def normalize_value(value: Any) -> Any:
@@ -49,10 +91,10 @@ def _needs_quotes(text: str) -> bool:
     lowered = text.lower()
     if lowered in _RESERVED_TOKENS:
         return True
-    if _NUMERIC_RE.match(text):
+    if _NUMERIC_RE.match(text) or _SCHEMA_REF_RE.match(text):
         return True
     for ch in text:
-        if ch.isspace() or ch in _DELIMITERS:
+        if ch.isspace() or ch in _DELIMITERS or ch in _QUOTE_CHARS:
             return True
     return False
 
@@ -73,6 +115,41 @@ def _encode_string(text: str) -> str:
     return text
 
 
+def _float_repr(value: float) -> str:
+    """Shortest text that round-trips, without a `.0` suffix on integral values."""
+    text = repr(value)
+    if text.endswith(".0"):
+        return "0" if text == "-0.0" else text[:-2]
+    return text
+
+
+def _float_formatter(policy: str) -> Callable[[float], str]:
+    """Return the formatter for a `float_format` policy (`repr`, `sig:N` or `fixed:N`)."""
+    match = _FLOAT_POLICY_RE.match(policy) if isinstance(policy, str) else None
+    if match is None or (match.group(1) == "sig" and int(match.group(2)) == 0):
+        raise ValueError(f"Unknown float format: {policy!r}")
+    kind, digits = match.groups()
+    if kind is None:
+        return _float_repr
+    if kind == "sig":
+        # `g` already drops trailing zeros.
+        spec = f".{digits}g"
+
+        def sig(value: float) -> str:
+            return format(value, spec)
+
+        return sig
+    spec = f".{digits}f"
+
+    def fixed(value: float) -> str:
+        text = format(value, spec)
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+
+    return fixed
+
+
 def _encode_primitive(value: Any) -> str:
     if value is None:
         return "null"
@@ -81,65 +158,380 @@ def _encode_primitive(value: Any) -> str:
     if isinstance(value, int):
         return str(value)
     if isinstance(value, float):
-        if value == 0.0:
-            return "0"
-        return format(value, "g")
+        return _float_repr(value)
     if isinstance(value, str):
         return _encode_string(value)
     return _encode_string(str(value))
 
 
+def _encode_value(value: Any, refs: dict[str, str] | None) -> str:
+    """Encode a primitive, replacing dictionary strings by their reference."""
+    if refs and isinstance(value, str):
+        ref = refs.get(value)
+        if ref is not None:
+            return ref
+    return _encode_primitive(value)
+
+
 def _is_primitive(value: Any) -> bool:
     return isinstance(value, (str, int, float, bool)) or value is None
 
 
-def _is_tabular(values: list[Any]) -> bool:
-    if not values or not all(isinstance(v, dict) for v in values):
-        return False
-    keys = list(values[0].keys())
-    if not keys:
-        return False
-    for row in values:
-        if list(row.keys()) != keys:
-            return False
-        if not all(_is_primitive(v) for v in row.values()):
-            return False
-    return True
+def _is_path_segment(key: Any) -> bool:
+    text = str(key)
+    return "." not in text and not _needs_quotes(text)
+
+
+def _collect_columns(
+    row: dict[Any, Any],
+    prefix: tuple[Any, ...],
+    columns: dict[tuple[Any, ...], None],
+    nested: dict[tuple[Any, ...], bool],
+    flatten: bool,
+    is_leaf: Callable[[Any], bool] = _is_primitive,
+) -> int | None:
+    """Add the leaf paths of `row` to `columns`; return the leaf count or None.
+
+    `is_leaf` decides which values are cells; the default expects values
+    that were already normalized.
+    """
+    count = 0
+    for key, item in row.items():
+        path = prefix + (key,)
+        if isinstance(item, dict):
+            if not flatten or not item or not _is_path_segment(key):
+                return None
+            if nested.setdefault(path, True) is not True:
+                return None
+            leaves = _collect_columns(item, path, columns, nested, flatten, is_leaf)
+            if leaves is None:
+                return None
+            count += leaves
+            continue
+        if not is_leaf(item) or nested.setdefault(path, False) is not False:
+            return None
+        if prefix and not _is_path_segment(key):
+            return None
+        columns[path] = None
+        count += 1
+    return count
+
 
+def _table_columns(
+    values: list[Any], sparsity: float, flatten: bool = True, is_leaf: Callable[[Any], bool] = _is_primitive
+) -> list[tuple[Any, ...]] | None:
+    """Return the table column paths for `values`, or None if they are not tabular.
 
-def _encode_table(values: list[dict[Any, Any]]) -> str:
-    keys = list(values[0].keys())
-    header = ",".join(_encode_string(str(k)) for k in keys)
-    rows = []
+    Rows must be non-empty dicts of primitives or, with `flatten`, of nested
+    non-empty dicts that are flattened into dotted columns. Columns are the
+    union of row paths in first-seen order; at most `sparsity` of the cells
+    may be missing.
+    """
+    if not values:
+        return None
+    columns: dict[tuple[Any, ...], None] = {}
+    nested: dict[tuple[Any, ...], bool] = {}
+    present = 0
     for row in values:
-        row_part = ",".join(_encode_primitive(row[k]) for k in keys)
-        rows.append(row_part)
-    return f"^csv[{header}|{'|'.join(rows)}]"
+        if not isinstance(row, dict) or not row:
+            return None
+        leaves = _collect_columns(row, (), columns, nested, flatten, is_leaf)
+        if leaves is None:
+            return None
+        present += leaves
+    total = len(values) * len(columns)
+    if total - present > sparsity * total:
+        return None
+    return list(columns)
+
+
+def _encode_column(path: tuple[Any, ...]) -> str:
+    if len(path) > 1:
+        return ".".join(str(k) for k in path)
+    text = str(path[0])
+    if "." in text and not _needs_quotes(text):
+        # Unquoted dotted header keys denote flattened nested columns.
+        return f"\"{_escape_string(text)}\""
+    return _encode_string(text)
 
 
-def _encode_list(values: list[Any]) -> str:
-    if _is_tabular(values):
-        return _encode_table(values)
+def _lookup(row: dict[Any, Any], path: tuple[Any, ...]) -> Any:
+    for key in path:
+        if not isinstance(row, dict) or key not in row:
+            return _MISSING
+        row = row[key]
+    return row
+
+
+def _encode_rows(
+    values: list[dict[Any, Any]],
+    columns: list[tuple[Any, ...]],
+    refs: dict[str, str] | None = None,
+    floats: list[Callable[[float], str]] | None = None,
+) -> list[str]:
+    """Return the `,`-joined cells of each table row.
+
+    Cells are encoded a column at a time, so each column's float formatter
+    is looked up once and all-float columns are formatted in one `map`.
+    """
+    if floats is None:
+        floats = [_float_repr] * len(columns)
+    encoded = []
+    for path, fmt in zip(columns, floats):
+        if len(path) == 1:
+            key = path[0]
+            cells = [row.get(key, _MISSING) for row in values]
+        else:
+            cells = [_lookup(row, path) for row in values]
+        if all(type(v) is float for v in cells):
+            encoded.append(list(map(fmt, cells)))
+            continue
+        # Missing keys are written as empty cells; the decoder omits them.
+        encoded.append(
+            [
+                fmt(v) if type(v) is float else "" if v is _MISSING else _encode_value(v, refs)
+                for v in cells
+            ]
+        )
+    return [",".join(cells) for cells in zip(*encoded)]
+
+
+def _table_floats(columns: list[tuple[Any, ...]], opts: dict[str, Any]) -> list[Callable[[float], str]]:
+    """Return the float formatter of each table column."""
+    default = opts["_float"] or _float_repr
+    per_column = opts["_column_floats"]
+    if not per_column:
+        return [default] * len(columns)
+    return [per_column.get(".".join(str(k) for k in path), default) for path in columns]
+
+
+def _encode_table(
+    values: list[dict[Any, Any]],
+    columns: list[tuple[Any, ...]],
+    registry: Any = None,
+    refs: dict[str, str] | None = None,
+    floats: list[Callable[[float], str]] | None = None,
+) -> str:
+    prefix = _table_prefix(columns, registry)
+    return f"{prefix}{'|'.join(_encode_rows(values, columns, refs, floats))}]"
+
+
+def _table_prefix(columns: list[tuple[Any, ...]], registry: Any) -> str:
+    """Return the table text up to its first row, registering the header if `registry` is set."""
+    header = ",".join(_encode_column(path) for path in columns)
+    if registry is not None and len(columns) >= registry.min_keys:
+        schema_id, new = registry.register(
+            tuple(str(path[0]) if len(path) == 1 else tuple(str(k) for k in path) for path in columns)
+        )
+        return f"^csv[@{schema_id},{header}|" if new else f"^@{schema_id}["
+    return f"^csv[{header}|"
+
+
+def _encode_list(values: list[Any], opts: dict[str, Any]) -> str:
+    columns = _table_columns(values, opts["sparsity"], opts["flatten"])
+    if columns is not None:
+        return _encode_table(
+            values, columns, opts["schema_registry"], opts["_string_refs"], _table_floats(columns, opts)
+        )
     if not values:
         return "[]"
-    return f"[{'|'.join(_encode(v) for v in values)}]"
+    return f"[{'|'.join(_encode(v, opts) for v in values)}]"
 
 
-def _encode_dict(values: dict[Any, Any]) -> str:
+def _encode_dict(values: dict[Any, Any], opts: dict[str, Any]) -> str:
     if not values:
         return "{}"
     keys = list(values.keys())
-    key_part = ",".join(_encode_string(str(k)) for k in keys)
-    value_part = "|".join(_encode(values[k]) for k in keys)
+    key_part = _dict_header(keys, opts["schema_registry"])
+    value_part = "|".join(_encode(values[k], opts) for k in keys)
     return f"{{{key_part}|{value_part}}}"
 
 
-def _encode(value: Any) -> str:
+def _dict_header(keys: list[Any], registry: Any) -> str:
+    """Return an object's key list, registering it if `registry` is set."""
+    key_part = ",".join(_encode_string(str(k)) for k in keys)
+    if registry is not None and len(keys) >= registry.min_keys:
+        schema_id, new = registry.register(str(k) for k in keys)
+        return f"@{schema_id},{key_part}" if new else f"@{schema_id}"
+    return key_part
+
+
+def _encode(value: Any, opts: dict[str, Any] = _DEFAULT_OPTIONS) -> str:
     if isinstance(value, dict):
-        return _encode_dict(value)
+        return _encode_dict(value, opts)
     if isinstance(value, list):
-        return _encode_list(value)
-    return _encode_primitive(value)
+        return _encode_list(value, opts)
+    if type(value) is float and opts["_float"] is not None:
+        return opts["_float"](value)
+    return _encode_value(value, opts["_string_refs"])
+
+
+def _iter_encode(value: Any, opts: dict[str, Any]) -> Iterator[str]:
+    """Yield the text of `_encode(value, opts)` in pieces.
+
+    Containers are split at their children and tables into chunks of
+    `_ROW_CHUNK` rows, so no piece is larger than one primitive-only child
+    or one chunk of rows.
+    """
+    if isinstance(value, dict) and value:
+        keys = list(value.keys())
+        yield f"{{{_dict_header(keys, opts['schema_registry'])}|"
+        for i, key in enumerate(keys):
+            if i:
+                yield "|"
+            yield from _iter_encode(value[key], opts)
+        yield "}"
+    elif isinstance(value, list) and value:
+        columns = _table_columns(value, opts["sparsity"], opts["flatten"])
+        if columns is None:
+            yield "["
+            for i, item in enumerate(value):
+                if i:
+                    yield "|"
+                yield from _iter_encode(item, opts)
+            yield "]"
+            return
+        yield _table_prefix(columns, opts["schema_registry"])
+        floats = _table_floats(columns, opts)
+        for start in range(0, len(value), _ROW_CHUNK):
+            rows = _encode_rows(value[start : start + _ROW_CHUNK], columns, opts["_string_refs"], floats)
+            yield ("|" if start else "") + "|".join(rows)
+        yield "]"
+    else:
+        yield _encode(value, opts)
+
+
+def _count_strings(value: Any, counts: dict[str, int]) -> None:
+    if isinstance(value, str):
+        counts[value] = counts.get(value, 0) + 1
+    elif isinstance(value, dict):
+        for item in value.values():
+            _count_strings(item, counts)
+    elif isinstance(value, list):
+        for item in value:
+            _count_strings(item, counts)
+
+
+def _string_dictionary(value: Any, min_length: int, min_count: int, estimate) -> tuple[dict[str, str], int]:
+    """Choose repeated string values worth replacing by `@N` references.
+
+    One counting pass over `value`; candidates are ranked by total length so
+    the most valuable strings get the shortest references, and each is kept
+    only if its estimated token gain is positive. Returns the string ->
+    reference map in dictionary order and the estimated tokens saved net of
+    the `^dict` preamble, or `({}, 0)` when nothing is saved.
+    """
+    counts: dict[str, int] = {}
+    _count_strings(value, counts)
+    candidates = [text for text, count in counts.items() if count >= min_count and len(text) >= min_length]
+    candidates.sort(key=lambda text: counts[text] * len(text), reverse=True)
+    refs: dict[str, str] = {}
+    saved = -estimate(f"{_DICT_PREFIX}[]")
+    for text in candidates:
+        ref = f"@{len(refs)}"
+        count = counts[text]
+        # The string is written once in the preamble plus a separator.
+        gain = (count - 1) * estimate(_encode_string(text)) - count * estimate(ref) - 1
+        if gain > 0:
+            refs[text] = ref
+            saved += gain
+    if saved <= 0:
+        return {}, 0
+    return refs, saved
+
+
+def _json_dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _hybrid_choice(
+    value: Any, text: str, cost: int, json_cost: int | None, estimate
+) -> tuple[str, int, int | None]:
+    if json_cost is None:
+        return text, cost, None
+    fragment_cost = json_cost + estimate(_JSON_PREFIX)
+    if fragment_cost < cost:
+        try:
+            return _JSON_PREFIX + _json_dumps(value), fragment_cost, json_cost
+        except (TypeError, ValueError):
+            # Keys such as tuples are valid TOON but not JSON.
+            return text, cost, None
+    return text, cost, json_cost
+
+
+def _hybrid(
+    value: Any, opts: dict[str, Any], memo: dict[Any, tuple[str, int, int | None]], estimate
+) -> tuple[str, int, int | None]:
+    """Return (text, tokens, json_tokens) for the cheapest encoding of `value`.
+
+    Candidates are TOON object/array syntax, a `^csv` table and an inline
+    `^json` fragment, chosen bottom-up by estimated tokens. `json_tokens` is
+    the cost of the subtree as plain JSON, used when an ancestor becomes a
+    fragment, or None when the subtree is not JSON serializable (it then
+    keeps its TOON form, written through `str()` like in toon mode).
+    Results are memoized per JSON primitive value and per identity for
+    everything else, so every node is costed once.
+    """
+    if value is None or isinstance(value, (str, int, float)):
+        key: Any = (type(value), value)
+    else:
+        key = id(value)
+    cached = memo.get(key)
+    if cached is not None:
+        return cached
+    if isinstance(value, dict) and value:
+        keys = list(value.keys())
+        children = [_hybrid(value[k], opts, memo, estimate) for k in keys]
+        key_part = ",".join(_encode_string(str(k)) for k in keys)
+        text = f"{{{key_part}|{'|'.join(child[0] for child in children)}}}"
+        cost = estimate(key_part) + sum(child[1] for child in children) + len(keys) + 1
+        json_cost: int | None = len(keys) + 1
+        for k, child in zip(keys, children):
+            if child[2] is None:
+                json_cost = None
+                break
+            json_cost += estimate(_json_dumps(str(k))) + 1 + child[2]
+        result = _hybrid_choice(value, text, cost, json_cost, estimate)
+    elif isinstance(value, list) and value:
+        children = [_hybrid(v, opts, memo, estimate) for v in value]
+        text = f"[{'|'.join(child[0] for child in children)}]"
+        cost = sum(child[1] for child in children) + len(children)
+        if any(child[2] is None for child in children):
+            json_cost = None
+        else:
+            json_cost = sum(child[2] for child in children) + len(children) + 1
+        # Tables compete on cost alone, so the sparsity limit does not apply.
+        columns = _table_columns(value, 1.0, opts["flatten"])
+        if columns is not None:
+            table = _encode_table(value, columns, floats=_table_floats(columns, opts))
+            table_cost = estimate(table)
+            if table_cost < cost:
+                text, cost = table, table_cost
+        result = _hybrid_choice(value, text, cost, json_cost, estimate)
+    else:
+        text = _encode(value, opts)
+        try:
+            json_cost = estimate(_json_dumps(value))
+        except (TypeError, ValueError):
+            json_cost = None
+        result = (text, estimate(text), json_cost)
+    memo[key] = result
+    return result
+
+
+def _resolve_options(options: dict | None) -> dict[str, Any]:
+    opts = dict(_DEFAULT_OPTIONS)
+    if options:
+        opts.update((k, options[k]) for k in _DEFAULT_OPTIONS if k in options)
+    if not 0.0 <= opts["sparsity"] <= 1.0:
+        raise ValueError(f"sparsity must be between 0 and 1, got {opts['sparsity']}")
+    policy = opts["float_format"]
+    if isinstance(policy, dict):
+        opts["_column_floats"] = {str(k): _float_formatter(v) for k, v in policy.items() if k != "*"}
+        policy = policy.get("*", "repr")
+    formatter = _float_formatter(policy)
+    opts["_float"] = None if formatter is _float_repr else formatter
+    return opts
 
 
 def encode(value: Any, options: dict | None = None) -> str:
@@ -147,11 +539,48 @@ def encode(value: Any, options: dict | None = None) -> str:
 
     Args:
         value: Python value to encode.
-        options: Reserved for future compatibility.
+        options: Optional settings:
+            mode: `toon` (default), `hybrid` or `auto`. Hybrid picks
+                TOON syntax, a `^csv` table or an inline `^json` fragment
+                for each subtree by estimated token cost.
+            candidates / metric: Passed to `encode_best` in auto mode.
+            sparsity: Maximum fraction of missing cells (0-1, default 0.5)
+                for a list of dicts to be encoded as a `^csv` table.
+            flatten: Flatten nested dicts in table rows into dotted
+                columns such as `geo.lat` (default True).
+            schema_registry: `SchemaRegistry` shared across documents;
+                object and table headers it has seen before are written
+                as `@N` references, after a `^schema` preamble. Ignored in
+                hybrid mode.
+            dedupe_strings: Move repeated string values into a `^dict`
+                preamble and write `@N` references instead (default False).
+                Output is unchanged when no tokens would be saved. Ignored
+                in hybrid mode.
+            dedupe_min_length / dedupe_min_count: Minimum length (default 8)
+                and number of occurrences (default 2) for a string to be
+                considered.
+            float_format: `repr` (default) for the shortest text that
+                round-trips, `sig:N` for N significant digits or `fixed:N`
+                for N decimals. A dict maps table column names (dotted for
+                flattened columns) to policies, with `*` for other floats.
 
     Returns:
         TOON string.
     """
+    text, normalized, opts, preamble = _prepare(value, options)
+    if text is not None:
+        return text
+    return preamble + _encode(normalized, opts)
+
+
+def _prepare(value: Any, options: dict | None) -> tuple[str | None, Any, dict[str, Any], str]:
+    """Resolve `encode` options for `value`.
+
+    Returns (text, normalized, opts, preamble): `text` is the whole output
+    when the mode (auto or hybrid) produced it, otherwise the output is
+    `preamble` (the `^schema` marker and `^dict` string dictionary, if
+    any) followed by the encoding of `normalized` with `opts`.
+    """
     if options:
         mode = options.get("mode", "toon")
         if mode == "auto":
@@ -161,8 +590,39 @@ def encode(value: Any, options: dict | None = None) -> str:
             candidates = options.get("candidates")
             metric = options.get("metric", "tokens")
             best = encode_best(value, candidates=candidates, metric=metric)
-            return best["text"]
+            return best["text"], None, _DEFAULT_OPTIONS, ""
         if mode not in {"toon", "hybrid"}:
             raise ValueError(f"Unknown encode mode: {mode}")
+    opts = _resolve_options(options)
     normalized = normalize_value(value)
-    return _encode(normalized)
+    if options and options.get("mode") == "hybrid":
+        # Local import to avoid circular dependency on tokens -> encoder.
+        from tokens import estimate_tokens
+
+        text, _, _ = _hybrid(normalized, opts, {}, estimate_tokens)
+        return text, normalized, opts, ""
+    preamble = ""
+    if opts["schema_registry"] is not None and isinstance(normalized, (dict, list)):
+        # Tells decoders that leading `@N` header tokens are schema IDs, not keys.
+        preamble = _SCHEMA_PREFIX
+    if opts["dedupe_strings"]:
+        # Local import to avoid circular dependency on tokens -> encoder.
+        from tokens import estimate_tokens
+
+        refs, _ = _string_dictionary(normalized, opts["dedupe_min_length"], opts["dedupe_min_count"], estimate_tokens)
+        if refs:
+            opts["_string_refs"] = refs
+            strings = "|".join(_encode_string(text) for text in refs)
+            preamble += f"{_DICT_PREFIX}[{strings}]"
+    return None, normalized, opts, preamble
+
+
+def _encode_pieces(value: Any, options: dict | None = None) -> Iterator[str]:
+    """Yield the text of `encode(value, options)` in pieces (see `_iter_encode`)."""
+    text, normalized, opts, preamble = _prepare(value, options)
+    if text is not None:
+        yield text
+        return
+    if preamble:
+        yield preamble
+    yield from _iter_encode(normalized, opts)
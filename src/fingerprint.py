@@ -0,0 +1,182 @@
+"""Structural fingerprints of values, stable across processes and runs.
+
+A fingerprint hashes a value the way `encode` sees it: the same
+normalization as `normalize_value` is applied on the fly (ISO dates,
+Decimal -> float, NaN/Inf -> null, -0.0 -> 0), numbers are hashed by their
+encoded text and keys by `str(key)`. Lists that `encode` writes as `^csv`
+tables are hashed as tables: their columns in header order and each row by
+its cells, independent of the row dict's own key order. Values with
+identical `encode` output (default options) therefore share a fingerprint,
+and it can be computed without encoding.
+
+Container items of a list (e.g. table rows) are hashed on their own and
+combined, so a table's fingerprint can be built row by row with `RowHasher`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable
+
+from encoder import _DEFAULT_SPARSITY, _collect_columns, _encode_primitive, _is_primitive, _table_columns, normalize_value
+
+_DIGEST_SIZE = 16
+
+
+def _leaf(value: Any) -> str:
+    if isinstance(value, str):
+        return f"s{len(value)}:{value}"
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+        return f"s{len(value)}:{value}"
+    if value is None or isinstance(value, (bool, int, float, Decimal)):
+        # Numbers are hashed by their encoded text, so 1 and 1.0 (both `1`) agree.
+        text = _encode_primitive(normalize_value(value))
+        return f"p{len(text)}:{text}"
+    # Other objects are encoded as strings.
+    text = str(value)
+    return f"s{len(text)}:{text}"
+
+
+def _is_leaf(value: Any) -> bool:
+    """Table cells before normalization: dates and Decimals become primitives."""
+    return _is_primitive(value) or isinstance(value, (datetime, date, Decimal))
+
+
+def _walk(value: Any, out: list[str]) -> None:
+    if isinstance(value, dict):
+        out.append(f"{{{len(value)}:")
+        for key, item in value.items():
+            key = str(key)
+            out.append(f"k{len(key)}:{key}")
+            _walk(item, out)
+        out.append("}")
+    elif isinstance(value, list):
+        columns = _table_columns(value, _DEFAULT_SPARSITY, True, _is_leaf)
+        if columns is None:
+            out.append("[")
+            out.extend(_item(item) for item in value)
+        else:
+            out.append("^")
+            out.extend(_row(row) for row in value)
+            out.append(_columns(columns))
+        out.append(f"]{len(value)}")
+    else:
+        out.append(_leaf(value))
+
+
+def _item(value: Any) -> str:
+    """List items: containers are hashed on their own so rows can be added one at a time."""
+    if isinstance(value, (dict, list)):
+        return "#" + _digest(value).hex()
+    return _leaf(value)
+
+
+def _cells(row: dict[Any, Any], prefix: str, out: list[str]) -> None:
+    for key, item in row.items():
+        key = str(key)
+        path = f"{prefix}{len(key)}:{key}"
+        if isinstance(item, dict):
+            _cells(item, path + ".", out)
+        else:
+            out.append(f"k{path}={_leaf(item)}")
+
+
+def _row(row: dict[Any, Any]) -> str:
+    """Table rows: cells are hashed by column path, since the header fixes their order."""
+    out: list[str] = []
+    _cells(row, "", out)
+    out.sort()
+    return "#" + _hash("".join(out)).hexdigest()
+
+
+def _columns(columns: Iterable[tuple[Any, ...]]) -> str:
+    parts = ["|"]
+    for path in columns:
+        parts.append(f"c{len(path)}:")
+        parts.extend(f"{len(key)}:{key}" for key in map(str, path))
+    return "".join(parts)
+
+
+def _hash(text: str) -> Any:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=_DIGEST_SIZE)
+
+
+def _digest(value: Any) -> bytes:
+    out: list[str] = []
+    _walk(value, out)
+    return _hash("".join(out)).digest()
+
+
+def fingerprint(value: Any) -> str:
+    """Return a hex structural hash of `value`.
+
+    Values that `encode` to the same text (with default options) always
+    share a fingerprint. Options such as `sparsity` are not part of the
+    hash, so include them in cache keys that span several settings.
+
+    Args:
+        value: Python value.
+
+    Returns:
+        32-character hex digest.
+    """
+    return _digest(value).hex()
+
+
+class RowHasher:
+    """Incrementally fingerprint a list (e.g. table rows) one item at a time.
+
+    `add` returns the item's own fingerprint, which can be checked against
+    a set of seen rows to skip duplicates before encoding them. `hexdigest`
+    equals `fingerprint` of the list of all items added so far.
+
+    Whether the list is a table is only known once every row is seen, so
+    both forms are hashed as rows arrive: the plain list, and (while rows
+    stay tabular) the table with its column union in first-seen order.
+    """
+
+    __slots__ = ("_plain", "_table", "_columns", "_nested", "_present", "_count")
+
+    def __init__(self, rows: Iterable[Any] = ()):
+        self._plain = _hash("[")
+        self._table: Any = _hash("^")
+        self._columns: dict[tuple[Any, ...], None] = {}
+        self._nested: dict[tuple[Any, ...], bool] = {}
+        self._present = 0
+        self._count = 0
+        for row in rows:
+            self.add(row)
+
+    def add(self, row: Any) -> str:
+        """Add one row and return its fingerprint."""
+        piece = _item(row)
+        self._plain.update(piece.encode("utf-8", "surrogatepass"))
+        self._count += 1
+        if self._table is not None:
+            leaves = None
+            if isinstance(row, dict) and row:
+                leaves = _collect_columns(row, (), self._columns, self._nested, True, _is_leaf)
+            if leaves is None:
+                self._table = None
+            else:
+                self._present += leaves
+                self._table.update(_row(row).encode("ascii"))
+        return piece[1:] if piece[0] == "#" else fingerprint(row)
+
+    def hexdigest(self) -> str:
+        """Fingerprint of the list of rows added so far."""
+        # Lists end with their length, so the running hash is finished on a copy.
+        total = self._count * len(self._columns)
+        if self._table is not None and self._count and total - self._present <= _DEFAULT_SPARSITY * total:
+            h = self._table.copy()
+            h.update(_columns(self._columns).encode("utf-8", "surrogatepass"))
+        else:
+            h = self._plain.copy()
+        h.update(b"]%d" % self._count)
+        return h.hexdigest()
+
+    def __len__(self) -> int:
+        return self._count
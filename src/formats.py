@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import json
+import re
 from typing import Any, Iterable
 
 from encoder import encode as encode_toon
-from tokens import count_tokens
+from tokens import count_tokens_many
+
+_YAML_QUOTE_RE = re.compile(r'[\s:\-#"]')
 
 
 def _is_primitive(value: Any) -> bool:
@@ -35,32 +38,47 @@ def _scalar_to_yaml(value: Any) -> str:
     if isinstance(value, (int, float)):
         return str(value)
     text = str(value)
-    if text == "" or any(ch.isspace() or ch in {":", "-", "#", "\""} for ch in text):
+    if text == "" or _YAML_QUOTE_RE.search(text):
         return f"\"{text.replace('\\', '\\\\').replace('"', '\\"')}\""
     return text
 
 
-def to_yaml_simple(value: Any, indent: int = 0) -> str:
-    pad = " " * indent
+def _emit_yaml(value: dict[Any, Any] | list[Any], pad: str, append) -> None:
+    child_pad = pad + "  "
     if isinstance(value, dict):
-        lines = []
         for k, v in value.items():
             if isinstance(v, (dict, list)):
-                lines.append(f"{pad}{k}:")
-                lines.append(to_yaml_simple(v, indent + 2))
+                append(f"{pad}{k}:")
+                if v:
+                    _emit_yaml(v, child_pad, append)
+                else:
+                    append("")
             else:
-                lines.append(f"{pad}{k}: {_scalar_to_yaml(v)}")
-        return "\n".join(lines)
-    if isinstance(value, list):
-        lines = []
-        for item in value:
-            if isinstance(item, (dict, list)):
-                lines.append(f"{pad}-")
-                lines.append(to_yaml_simple(item, indent + 2))
+                append(f"{pad}{k}: {_scalar_to_yaml(v)}")
+        return
+    for item in value:
+        if isinstance(item, (dict, list)):
+            append(f"{pad}-")
+            if item:
+                _emit_yaml(item, child_pad, append)
             else:
-                lines.append(f"{pad}- {_scalar_to_yaml(item)}")
-        return "\n".join(lines)
-    return f"{pad}{_scalar_to_yaml(value)}"
+                append("")
+        else:
+            append(f"{pad}- {_scalar_to_yaml(item)}")
+
+
+def to_yaml_simple(value: Any, indent: int = 0) -> str:
+    """Emit the YAML subset understood by `decode`.
+
+    Every level appends its lines to one shared buffer that is joined once,
+    so output is built in linear time instead of being re-joined per level.
+    Empty containers leave a blank line, as in earlier releases.
+    """
+    if not isinstance(value, (dict, list)):
+        return " " * indent + _scalar_to_yaml(value)
+    lines: list[str] = []
+    _emit_yaml(value, " " * indent, lines.append)
+    return "\n".join(lines)
 
 
 def to_csv(value: Any) -> str | None:
@@ -112,10 +130,11 @@ def _candidate_formats(value: Any, candidates: Iterable[str] | None) -> list[str
 
 def encode_best(value: Any, candidates: Iterable[str] | None = None, metric: str = "tokens") -> dict:
     formats = _candidate_formats(value, candidates)
+    texts = [encode_as(value, fmt) for fmt in formats]
+    # All candidates are counted in one batched call.
+    scores = count_tokens_many(texts)[None] if metric == "tokens" else [len(text) for text in texts]
     best = None
-    for fmt in formats:
-        text = encode_as(value, fmt)
-        score = count_tokens(text) if metric == "tokens" else len(text)
+    for fmt, text, score in zip(formats, texts, scores):
         if best is None or score < best["score"]:
             best = {"format": fmt, "text": text, "score": score, "chars": len(text)}
     if best is None:
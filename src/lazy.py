@@ -0,0 +1,472 @@
+"""Lazy TOON decoding with on-demand subtree materialization.
+
+`decode_lazy` runs a single bracket/quote prescan over the input to index the
+boundaries of every container, then hands out Mapping/Sequence proxies that
+only parse a child when it is accessed.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import chain
+from typing import Any, Iterator
+
+from decoder import (
+    _DICT_PREAMBLE_RE,
+    _DecodeContext,
+    _SCHEMA_DEF_RE,
+    _SCHEMA_PREAMBLE_RE,
+    _SCHEMA_REF_RE,
+    _parse_keys,
+    _parse_token,
+    _parse_value,
+    _skip_ws,
+    _split_csv_segment,
+    _table_header,
+    _table_row,
+)
+
+# A quote only opens a string at the start of a token, mirroring _parse_token.
+# `^json` fragments are skipped with _JSON_SCAN_RE, where quotes follow JSON rules.
+_SCAN_RE = re.compile(r'(?<![^{}\[\]|,^\s])"(?:[^"\\]|\\.)*"?|\^\s*(?i:json)|[{}\[\]]', re.S)
+_JSON_SCAN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.S)
+# Table rows toggle quoting on any quote character, mirroring _read_segment.
+_SEGMENT_RE = re.compile(r'"(?:[^"\\]|\\.)*"?|\\.|[|\]]', re.S)
+_QUOTED_RE = re.compile(r'"(?:[^"\\]|\\.)*"?', re.S)
+_TOKEN_RE = re.compile(r"[^{}\[\]|,^\s]*")
+# Matched against the text just before a `[` to tell `^csv[` headers from arrays.
+_CSV_OPEN_RE = re.compile(r"\^\s*csv\s*\Z", re.IGNORECASE)
+
+
+def _json_close(text: str, idx: int) -> int | None:
+    """Return the offset of the bracket closing the JSON container at `idx`, if any."""
+    depth = 0
+    for match in _JSON_SCAN_RE.finditer(text, idx):
+        ch = text[match.start()]
+        if ch == "\"":
+            continue
+        depth += 1 if ch in "{[" else -1
+        if depth == 0:
+            return match.start()
+    return None
+
+
+def _scan(text: str, idx: int = 0) -> Iterator[int]:
+    """Yield the offsets of brackets from `idx`, skipping strings and `^json` fragment bodies."""
+    pos = idx
+    while True:
+        match = _SCAN_RE.search(text, pos)
+        if match is None:
+            return
+        pos = match.end()
+        ch = text[match.start()]
+        if ch == "\"":
+            continue
+        if ch == "^":
+            start = _skip_ws(text, pos)
+            if start < len(text) and text[start] in "{[":
+                yield start
+                close = _json_close(text, start)
+                if close is None:
+                    return
+                yield close
+                pos = close + 1
+            continue
+        yield match.start()
+
+
+class _Index(dict):
+    """Offsets of every opening bracket mapped to the matching close, plus
+    the document's `_Schemas`."""
+
+    __slots__ = ("schemas",)
+
+
+def _build_index(text: str) -> _Index:
+    """Map the offset of every opening bracket to its matching close."""
+    closes = _Index()
+    stack: list[int] = []
+    for pos in _scan(text):
+        if text[pos] in "{[":
+            stack.append(pos)
+        elif stack:
+            closes[stack.pop()] = pos
+    closes.schemas = _Schemas(text, closes)
+    return closes
+
+
+def _container_end(text: str, idx: int, index: dict[int, int] | None) -> int:
+    """Return the offset just past the container opening at `idx`."""
+    if index is not None:
+        close = index.get(idx)
+        return len(text) if close is None else close + 1
+    depth = 0
+    for pos in _scan(text, idx):
+        depth += 1 if text[pos] in "{[" else -1
+        if depth == 0:
+            return pos + 1
+    return len(text)
+
+
+def _is_json_fragment(text: str, idx: int) -> bool:
+    idx = _skip_ws(text, idx + 1)
+    return text[idx : idx + 4].lower() == "json"
+
+
+def _check_plain(text: str) -> int:
+    """Return the offset of the root value, past a `^schema` preamble."""
+    marker = _SCHEMA_PREAMBLE_RE.match(text)
+    idx = 0 if marker is None else marker.end()
+    if _DICT_PREAMBLE_RE.match(text, idx):
+        raise ValueError("String dictionary (^dict) input requires decode()")
+    return idx
+
+
+def _has_schema_ids(text: str) -> bool:
+    """Whether `@N` header tokens in `text` are schema IDs (see `_DecodeContext`)."""
+    return _SCHEMA_PREAMBLE_RE.match(text) is not None
+
+
+def _header_keys(text: str, idx: int) -> tuple[list[str], int]:
+    """Parse the keys of an object header from `idx` up to its `|`.
+
+    Returns the keys and the first value offset, or no keys if the object
+    closes first.
+    """
+    keys = []
+    while idx < len(text):
+        key, idx = _parse_token(text, idx, {",", "|", "}"})
+        keys.append(str(key))
+        idx = _skip_ws(text, idx)
+        if idx >= len(text) or text[idx] == "}":
+            return [], idx
+        idx += 1
+        if text[idx - 1] == "|":
+            break
+    return keys, idx
+
+
+def _collect_definitions(text: str, index: dict[int, int] | None) -> dict[int, list[Any]]:
+    """Return the inline `@N,` definitions of object and `^csv` headers in `text`."""
+    schemas: dict[int, list[Any]] = {}
+    for pos in _scan(text) if index is None else index:
+        if text[pos] == "{":
+            ref = _SCHEMA_REF_RE.match(text, _skip_ws(text, pos + 1))
+            if ref is not None and text[ref.end() : ref.end() + 1] == ",":
+                keys, _ = _header_keys(text, ref.end() + 1)
+                if keys:
+                    schemas[int(ref.group(1))] = keys
+        elif text[pos] == "[" and _CSV_OPEN_RE.search(text, max(0, pos - 64), pos):
+            tokens = _split_csv_segment(next(_iter_segments(text, pos + 1), ""))
+            definition = _SCHEMA_DEF_RE.fullmatch(tokens[0])
+            if definition is not None:
+                schemas[int(definition.group(1))] = _table_header(tokens[1:])
+    return schemas
+
+
+class _Schemas:
+    """Schema IDs of one document: whether `@N` header tokens are IDs (see
+    `_DecodeContext`) and its inline definitions, collected on first use so
+    that references resolve like in `decode`."""
+
+    __slots__ = ("ids", "_text", "_index", "_definitions")
+
+    def __init__(self, text: str, index: dict[int, int] | None):
+        self.ids = _has_schema_ids(text)
+        self._text = text
+        self._index = index
+        self._definitions: dict[int, list[Any]] | None = None
+
+    def definitions(self) -> dict[int, list[Any]]:
+        if self._definitions is None:
+            self._definitions = _collect_definitions(self._text, self._index) if self.ids else {}
+        return self._definitions
+
+    def resolve(self, schema_id: int) -> list[Any]:
+        keys = self.definitions().get(schema_id)
+        if keys is None:
+            raise ValueError(
+                f"Schema reference @{schema_id} is not defined in the document; use decode() with a schema_registry"
+            )
+        return keys
+
+    def context(self) -> _DecodeContext:
+        """Return a decode context for subtrees of the document."""
+        ctx = _DecodeContext(schema_ids=self.ids)
+        ctx.schemas.update(self.definitions())
+        return ctx
+
+
+def _object_header(text: str, idx: int, schemas: _Schemas) -> tuple[list[Any], int]:
+    """Parse the key header of the object at `idx`; return keys and the first value offset.
+
+    An `@N,` definition is skipped and an `@N|` reference resolved through
+    `schemas`. An object without values has no keys.
+    """
+    idx = _skip_ws(text, idx + 1)
+    if idx < len(text) and text[idx] == "}":
+        return [], idx
+    if schemas.ids:
+        ref = _SCHEMA_REF_RE.match(text, idx)
+        follow = None if ref is None else text[ref.end() : ref.end() + 1]
+        if follow == "|":
+            return list(schemas.resolve(int(ref.group(1)))), ref.end() + 1
+        if follow == ",":
+            idx = ref.end() + 1
+    return _header_keys(text, idx)
+
+
+def _table_header_keys(segment: str, schema_ids: bool) -> list[Any]:
+    tokens = _split_csv_segment(segment)
+    if schema_ids and _SCHEMA_DEF_RE.fullmatch(tokens[0]):
+        tokens = tokens[1:]
+    return _table_header(tokens)
+
+
+def _table_rows_start(text: str, idx: int, index: dict[int, int] | None) -> int:
+    """Return the offset of the `[` that opens the rows of the table at `idx`.
+
+    For a `^json` fragment this is the offset of its opening bracket.
+    """
+    idx = _skip_ws(text, idx + 1)
+    if text[idx : idx + 4].lower() == "json":
+        idx = _skip_ws(text, idx + 4)
+        if idx >= len(text) or text[idx] not in "{[":
+            raise ValueError("Invalid json fragment")
+        return idx
+    if text[idx : idx + 3].lower() == "csv":
+        idx = _skip_ws(text, idx + 3)
+    elif idx < len(text) and text[idx] == "@":
+        ref = _SCHEMA_REF_RE.match(text, idx)
+        idx = idx if ref is None else ref.end()
+    elif idx < len(text) and text[idx] == "{":
+        idx = _skip_ws(text, _container_end(text, idx, index))
+    if idx >= len(text) or text[idx] != "[":
+        raise ValueError("Invalid table header")
+    return idx
+
+
+def _value_end(text: str, idx: int, index: dict[int, int] | None = None) -> int:
+    """Return the offset just past the value starting at `idx` without decoding it."""
+    idx = _skip_ws(text, idx)
+    if idx >= len(text):
+        return idx
+    ch = text[idx]
+    if ch in "{[":
+        return _container_end(text, idx, index)
+    if ch == "^":
+        start = _table_rows_start(text, idx, index)
+        if _is_json_fragment(text, idx):
+            close = _json_close(text, start)
+            return len(text) if close is None else close + 1
+        return _container_end(text, start, index)
+    if ch == "\"":
+        return _QUOTED_RE.match(text, idx).end()
+    return _TOKEN_RE.match(text, idx).end()
+
+
+def _segment_bounds(text: str, start: int, end: int | None = None) -> Iterator[tuple[int, int]]:
+    """Yield the (start, end) offsets of `|`-delimited segments up to `end` or the closing `]`."""
+    if end is None:
+        end = len(text)
+    for match in _SEGMENT_RE.finditer(text, start, end):
+        ch = text[match.start()]
+        if ch == "]":
+            end = match.start()
+            break
+        if ch == "|":
+            yield start, match.start()
+            start = match.end()
+    yield start, end
+
+
+def _iter_segments(text: str, start: int, end: int | None = None) -> Iterator[str]:
+    """Yield the `|`-delimited segments from `start` up to `end` or the closing `]`."""
+    for seg_start, seg_end in _segment_bounds(text, start, end):
+        yield text[seg_start:seg_end]
+
+
+def _materialize(text: str, idx: int, index: _Index) -> Any:
+    idx = _skip_ws(text, idx)
+    if idx >= len(text):
+        return None
+    ch = text[idx]
+    if ch == "{":
+        return LazyObject(text, idx, index)
+    if ch == "[":
+        return LazyArray(text, idx, index)
+    if ch == "^" and not _is_json_fragment(text, idx):
+        return LazyTable(text, idx, index)
+    value, _ = _parse_value(text, idx)
+    return value
+
+
+class _LazyNode:
+    __slots__ = ("_text", "_start", "_index")
+
+    def __init__(self, text: str, start: int, index: _Index):
+        self._text = text
+        self._start = start
+        self._index = index
+
+    def materialize(self) -> Any:
+        """Decode this subtree into plain Python values."""
+        value, _ = _parse_value(self._text, self._start, self._index.schemas.context())
+        return value
+
+
+class LazyObject(_LazyNode, Mapping):
+    """Read-only mapping over a TOON object; values are decoded on first access."""
+
+    __slots__ = ("_offsets", "_cache")
+
+    def __init__(self, text: str, start: int, index: _Index):
+        super().__init__(text, start, index)
+        self._offsets: dict[str, int] = {}
+        self._cache: dict[str, Any] = {}
+        keys, idx = _object_header(text, start, index.schemas)
+        for key in keys:
+            idx = _skip_ws(text, idx)
+            self._offsets[key] = idx
+            idx = _skip_ws(text, _value_end(text, idx, index))
+            if idx >= len(text) or text[idx] != "|":
+                break
+            idx += 1
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._cache:
+            return self._cache[key]
+        value = _materialize(self._text, self._offsets[key], self._index)
+        self._cache[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __repr__(self) -> str:
+        return f"LazyObject({list(self._offsets)!r})"
+
+
+class LazyArray(_LazyNode, Sequence):
+    """Read-only sequence over a TOON array; items are decoded on first access."""
+
+    __slots__ = ("_offsets", "_cache")
+
+    def __init__(self, text: str, start: int, index: _Index):
+        super().__init__(text, start, index)
+        self._offsets: list[int] = []
+        self._cache: dict[int, Any] = {}
+        idx = _skip_ws(text, start + 1)
+        if idx < len(text) and text[idx] == "]":
+            return
+        while idx < len(text):
+            self._offsets.append(idx)
+            idx = _skip_ws(text, _value_end(text, idx, index))
+            if idx >= len(text) or text[idx] != "|":
+                break
+            idx = _skip_ws(text, idx + 1)
+
+    def __getitem__(self, pos: int | slice) -> Any:
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self._offsets)
+            if pos < 0:
+                raise IndexError("index out of range")
+        if pos in self._cache:
+            return self._cache[pos]
+        value = _materialize(self._text, self._offsets[pos], self._index)
+        self._cache[pos] = value
+        return value
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"LazyArray(len={len(self)})"
+
+
+class LazyTable(_LazyNode, Sequence):
+    """Read-only sequence over a `^csv` or `^{keys}` table; rows are decoded on access.
+
+    Only the row offsets are kept; a row's text is sliced when it is indexed.
+    """
+
+    __slots__ = ("_keys", "_rows", "_cache")
+
+    def __init__(self, text: str, start: int, index: _Index):
+        super().__init__(text, start, index)
+        self._cache: dict[int, dict[str, Any]] = {}
+        rows_start = _table_rows_start(text, start, index)
+        rows_end = _container_end(text, rows_start, index) - 1
+        # Flat (start, end) pairs: 16 bytes per row instead of a copy of its text.
+        bounds = array("q", chain.from_iterable(_segment_bounds(text, rows_start + 1, rows_end)))
+        if bounds[-2] == bounds[-1]:
+            del bounds[-2:]
+        header = _skip_ws(text, start + 1)
+        if text[header] == "{":
+            self._keys, _ = _parse_keys(text, header)
+        elif text[header] == "@":
+            self._keys = list(index.schemas.resolve(int(_SCHEMA_REF_RE.match(text, header).group(1))))
+        elif bounds:
+            self._keys = _table_header_keys(text[bounds[0] : bounds[1]], index.schemas.ids)
+            del bounds[:2]
+        else:
+            self._keys = []
+        self._rows = bounds
+
+    @property
+    def keys(self) -> list[str]:
+        return list(self._keys)
+
+    def __getitem__(self, pos: int | slice) -> Any:
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("index out of range")
+        if pos in self._cache:
+            return self._cache[pos]
+        row_start, row_end = self._rows[2 * pos], self._rows[2 * pos + 1]
+        row = _table_row(self._keys, _split_csv_segment(self._text[row_start:row_end]))
+        self._cache[pos] = row
+        return row
+
+    def __len__(self) -> int:
+        return len(self._rows) // 2
+
+    __eq__ = LazyArray.__eq__
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"LazyTable(keys={self._keys!r}, len={len(self)})"
+
+
+def decode_lazy(input_str: str) -> Any:
+    """Decode TOON text lazily.
+
+    Containers are returned as `LazyObject`, `LazyArray` or `LazyTable`
+    proxies that parse children on first access and cache them. Primitives
+    are decoded immediately.
+
+    Args:
+        input_str: TOON text.
+
+    Returns:
+        A lazy proxy or a decoded primitive.
+    """
+    start = _check_plain(input_str)
+    return _materialize(input_str, start, _build_index(input_str))
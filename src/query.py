@@ -0,0 +1,245 @@
+"""Path queries over TOON text without a full decode.
+
+Paths are dotted keys with optional bracket selectors::
+
+    users[*].name
+    meta.tags[0]
+    ["key.with.dots"][-1]
+
+`*` (or `[*]`) selects every child of an object, array or table. Subtrees
+that are not on the path are skipped by bracket/quote scanning, and for
+tables only the requested column of each selected row is parsed.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Iterator
+
+from decoder import (
+    _SCHEMA_REF_RE,
+    _parse_keys,
+    _parse_primitive,
+    _parse_value,
+    _skip_ws,
+    _split_csv_segment,
+    _table_row,
+    _unescape_string,
+)
+from lazy import (
+    _check_plain,
+    _is_json_fragment,
+    _iter_segments,
+    _object_header,
+    _Schemas,
+    _table_header_keys,
+    _table_rows_start,
+    _value_end,
+)
+
+_PATH_RE = re.compile(r'\.?(?:([^.\[\]]+)|\[(\*|-?\d+|"(?:[^"\\]|\\.)*")\])')
+_CELL_RE = re.compile(r'"(?:[^"\\]|\\.)*"?|\\.|,', re.S)
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=256)
+def _compile_path(path: str) -> tuple[tuple[str, Any], ...]:
+    steps = []
+    pos = 0
+    while pos < len(path):
+        match = _PATH_RE.match(path, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"Invalid path: {path!r}")
+        key, selector = match.groups()
+        if key is not None:
+            steps.append(("all", None) if key == "*" else ("key", key))
+        elif selector == "*":
+            steps.append(("all", None))
+        elif selector.startswith("\""):
+            steps.append(("key", _unescape_string(selector[1:-1])))
+        else:
+            steps.append(("index", int(selector)))
+        pos = match.end()
+    return tuple(steps)
+
+
+def _object_values(text: str, idx: int, count: int) -> Iterator[int]:
+    """Yield the offsets of up to `count` object values starting at `idx`."""
+    for _ in range(count):
+        idx = _skip_ws(text, idx)
+        yield idx
+        idx = _skip_ws(text, _value_end(text, idx))
+        if idx >= len(text) or text[idx] != "|":
+            return
+        idx += 1
+
+
+def _array_items(text: str, idx: int) -> Iterator[int]:
+    """Yield the offset of every item of the array at `idx`, skipping values."""
+    idx = _skip_ws(text, idx + 1)
+    if idx < len(text) and text[idx] == "]":
+        return
+    while idx < len(text):
+        yield idx
+        idx = _skip_ws(text, _value_end(text, idx))
+        if idx >= len(text) or text[idx] != "|":
+            return
+        idx = _skip_ws(text, idx + 1)
+
+
+def _select_items(items: Iterator[Any], step: tuple[str, Any]) -> Iterator[Any]:
+    kind, arg = step
+    if kind == "all":
+        yield from items
+        return
+    if arg < 0:
+        items = list(items)
+        if -arg <= len(items):
+            yield items[arg]
+        return
+    for pos, item in enumerate(items):
+        if pos == arg:
+            yield item
+            return
+
+
+def _csv_cell(segment: str, column: int) -> Any:
+    """Parse only the cell at `column` of a table row segment."""
+    start = 0
+    end = None
+    for match in _CELL_RE.finditer(segment):
+        if segment[match.start()] != ",":
+            continue
+        if column == 0:
+            end = match.start()
+            break
+        column -= 1
+        start = match.end()
+    if column > 0:
+        return _MISSING
+    token = segment[start:end]
+    if token.strip() == "":
+        return _MISSING
+    return _parse_primitive(token)
+
+
+def _walk_table(text: str, idx: int, steps: tuple[tuple[str, Any], ...], schemas: _Schemas) -> Iterator[Any]:
+    rows_start = _table_rows_start(text, idx, None)
+    segments = _iter_segments(text, rows_start + 1)
+    header = _skip_ws(text, idx + 1)
+    if text[header] == "{":
+        keys, _ = _parse_keys(text, header)
+    elif text[header] == "@":
+        keys = schemas.resolve(int(_SCHEMA_REF_RE.match(text, header).group(1)))
+    else:
+        keys = _table_header_keys(next(segments), schemas.ids)
+    rows = (segment for segment in segments if segment != "")
+    selected = _select_items(rows, steps[0])
+    rest = steps[1:]
+    if not rest:
+        for segment in selected:
+            yield _table_row(keys, _split_csv_segment(segment))
+        return
+    if any(kind != "key" for kind, _ in rest):
+        return
+    target = tuple(arg for _, arg in rest)
+    paths = [key if isinstance(key, tuple) else (key,) for key in keys]
+    if target in paths:
+        column = len(paths) - 1 - paths[::-1].index(target)
+        for segment in selected:
+            value = _csv_cell(segment, column)
+            if value is not _MISSING:
+                yield value
+        return
+    # A prefix of flattened columns selects the re-nested object.
+    depth = len(target)
+    nested = [(i, path[depth:]) for i, path in enumerate(paths) if len(path) > depth and path[:depth] == target]
+    if not nested:
+        return
+    sub_keys = [path if len(path) > 1 else path[0] for _, path in nested]
+    for segment in selected:
+        tokens = _split_csv_segment(segment)
+        value = _table_row(sub_keys, [tokens[i] if i < len(tokens) else "" for i, _ in nested])
+        if value:
+            yield value
+
+
+def _walk_decoded(value: Any, steps: tuple[tuple[str, Any], ...]) -> Iterator[Any]:
+    """Apply `steps` to an already decoded value (used for `^json` fragments)."""
+    if not steps:
+        yield value
+        return
+    kind, arg = steps[0]
+    if isinstance(value, dict):
+        if kind == "all":
+            children: Iterator[Any] = iter(value.values())
+        elif kind == "key" and arg in value:
+            children = iter((value[arg],))
+        else:
+            return
+    elif isinstance(value, list) and kind != "key":
+        children = _select_items(iter(value), steps[0])
+    else:
+        return
+    for child in children:
+        yield from _walk_decoded(child, steps[1:])
+
+
+def _walk(text: str, idx: int, steps: tuple[tuple[str, Any], ...], schemas: _Schemas) -> Iterator[Any]:
+    idx = _skip_ws(text, idx)
+    if not steps:
+        value, _ = _parse_value(text, idx, schemas.context())
+        yield value
+        return
+    if idx >= len(text):
+        return
+    ch = text[idx]
+    kind, arg = steps[0]
+    if ch == "{":
+        if kind == "index":
+            return
+        keys, start = _object_header(text, idx, schemas)
+        if kind == "all":
+            for value_start in _object_values(text, start, len(keys)):
+                yield from _walk(text, value_start, steps[1:], schemas)
+            return
+        if arg not in keys:
+            return
+        # Later duplicates win, as in the full decoder.
+        target = len(keys) - 1 - keys[::-1].index(arg)
+        for pos, value_start in enumerate(_object_values(text, start, target + 1)):
+            if pos == target:
+                yield from _walk(text, value_start, steps[1:], schemas)
+    elif ch == "[":
+        if kind == "key":
+            return
+        for start in _select_items(_array_items(text, idx), steps[0]):
+            yield from _walk(text, start, steps[1:], schemas)
+    elif ch == "^":
+        if _is_json_fragment(text, idx):
+            value, _ = _parse_value(text, idx)
+            yield from _walk_decoded(value, steps)
+        elif kind != "key":
+            yield from _walk_table(text, idx, steps, schemas)
+
+
+def query(input_str: str, path: str) -> list[Any]:
+    """Return every value in TOON text matching `path`.
+
+    Args:
+        input_str: TOON text.
+        path: Query path such as `users[*].name`.
+
+    Returns:
+        List of matching decoded values (empty when nothing matches).
+    """
+    start = _check_plain(input_str)
+    return list(_walk(input_str, start, _compile_path(path), _Schemas(input_str, None)))
+
+
+def select(input_str: str, path: str, default: Any = None) -> Any:
+    """Return the first value in TOON text matching `path`, or `default`."""
+    start = _check_plain(input_str)
+    return next(_walk(input_str, start, _compile_path(path), _Schemas(input_str, None)), default)
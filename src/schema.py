@@ -0,0 +1,92 @@
+"""Cross-document schema registry for TOON key headers.
+
+Encoding with a `SchemaRegistry` replaces repeated object and table headers
+with short numeric references:
+
+- first use defines the ID inline: `{@3,id,name|1|A}` or `^csv[@3,id,name|1,A]`
+- later uses only reference it: `{@3|2|B}` or `^@3[2,B|3,C]`
+
+Such documents start with a `^schema` preamble, so that decoding without a
+registry still reads `@N` header tokens as IDs rather than keys.
+
+Decoding with the same registry (or one that has seen the defining
+documents) resolves the references.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Iterable
+
+
+def _intern_keys(keys: Iterable[Any]) -> tuple[Any, ...]:
+    # Interned strings make tuple hashing/equality checks cheap identity hits.
+    return tuple(
+        tuple(sys.intern(part) for part in key) if isinstance(key, tuple) else sys.intern(key)
+        for key in keys
+    )
+
+
+class SchemaRegistry:
+    """Assigns short IDs to key tuples shared across encoded documents.
+
+    Keys are header names as decoded: `str` for plain keys and `tuple` paths
+    for flattened table columns.
+
+    Args:
+        schemas: Key tuples to pre-register, in ID order (e.g. the output of
+            `schemas()` from another registry).
+        min_keys: Headers with fewer keys are never registered.
+    """
+
+    __slots__ = ("_ids", "_schemas", "min_keys")
+
+    def __init__(self, schemas: Iterable[Iterable[Any]] = (), min_keys: int = 2):
+        self._ids: dict[tuple[Any, ...], int] = {}
+        self._schemas: list[tuple[Any, ...]] = []
+        self.min_keys = min_keys
+        for keys in schemas:
+            self.register(keys)
+
+    def register(self, keys: Iterable[Any]) -> tuple[int, bool]:
+        """Return the ID for `keys` and whether it was newly assigned."""
+        keys = _intern_keys(keys)
+        schema_id = self._ids.get(keys)
+        if schema_id is not None:
+            return schema_id, False
+        schema_id = len(self._schemas)
+        self._ids[keys] = schema_id
+        self._schemas.append(keys)
+        return schema_id, True
+
+    def lookup(self, keys: Iterable[Any]) -> int | None:
+        """Return the ID for `keys`, or None if it is not registered."""
+        return self._ids.get(_intern_keys(keys))
+
+    def resolve(self, schema_id: int) -> tuple[Any, ...]:
+        """Return the key tuple for `schema_id`."""
+        if not 0 <= schema_id < len(self._schemas):
+            raise ValueError(f"Unknown schema id: {schema_id}")
+        return self._schemas[schema_id]
+
+    def define(self, schema_id: int, keys: Iterable[Any]) -> None:
+        """Record an inline definition seen while decoding."""
+        keys = _intern_keys(keys)
+        if schema_id < len(self._schemas):
+            if self._schemas[schema_id] != keys:
+                raise ValueError(f"Conflicting definition for schema id: {schema_id}")
+            return
+        if schema_id != len(self._schemas) or keys in self._ids:
+            raise ValueError(f"Out-of-order definition for schema id: {schema_id}")
+        self._ids[keys] = schema_id
+        self._schemas.append(keys)
+
+    def schemas(self) -> list[tuple[Any, ...]]:
+        """Return registered key tuples in ID order, for sharing with another process."""
+        return list(self._schemas)
+
+    def __len__(self) -> int:
+        return len(self._schemas)
+
+    def __repr__(self) -> str:
+        return f"SchemaRegistry({len(self._schemas)} schemas)"
@@ -2,19 +2,41 @@
 
 from __future__ import annotations
 
-from typing import Any
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Iterable
 
 from encoder import encode
 
+# Rough stand-in for a BPE pre-tokenizer: words and 1-3 digit groups (with an
+# optional leading space), whitespace runs, and punctuation in pairs.
+_ESTIMATE_RE = re.compile(r" ?[A-Za-z]+| ?\d{1,3}|\s+|[^\sA-Za-z\d]{1,2}")
 
-def _get_encoder():
+
+_DEFAULT_MODELS = ("gpt-4o-mini", "gpt-4o", "gpt-4-turbo")
+
+# Token counts keyed by (encoding name, text), shared by every counting call.
+# Cleared wholesale when full to keep memory bounded.
+_COUNT_CACHE: dict[tuple[str, str], int] = {}
+_COUNT_CACHE_SIZE = 1 << 16
+# Longer texts are counted but not cached, so the cache stays small in bytes.
+_COUNT_CACHE_MAX_TEXT = 1 << 12
+# Fewer missing texts than this are encoded one by one: thread pool setup
+# costs more than `encode_batch` saves on small batches.
+_BATCH_MIN = 8
+
+
+@lru_cache(maxsize=None)
+def _get_encoder(model: str | None = None):
+    """Return the tiktoken encoding for `model` (default chain when None), cached."""
     try:
         import tiktoken
     except Exception:
         return None
-    for model in ("gpt-4o-mini", "gpt-4o", "gpt-4-turbo"):
+    for name in (model,) if model else _DEFAULT_MODELS:
         try:
-            return tiktoken.encoding_for_model(model)
+            return tiktoken.encoding_for_model(name)
         except Exception:
             continue
     try:
@@ -23,17 +45,110 @@ def _get_encoder():
         return None
 
 
-def count_tokens(value: Any) -> int:
+def warmup(models: Iterable[str] | None = None, background: bool = True) -> threading.Thread | None:
+    """Preload tokenizer encodings so the first `count_tokens` call is fast.
+
+    Loading an encoding reads and parses its BPE ranks, which can take
+    hundreds of milliseconds on a cold process.
+
+    Args:
+        models: Model names to preload; None loads the default encoding.
+        background: Load in a daemon thread (default) instead of blocking.
+
+    Returns:
+        The started thread (join it to wait), or None when run inline.
+    """
+    names = [None] if models is None else list(models)
+
+    def load() -> None:
+        for name in names:
+            _get_encoder(name)
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name="toon-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _cache_counts(name: str, texts: list[str], counts: Iterable[int]) -> None:
+    if len(_COUNT_CACHE) + len(texts) > _COUNT_CACHE_SIZE:
+        _COUNT_CACHE.clear()
+    for text, count in zip(texts, counts):
+        if len(text) <= _COUNT_CACHE_MAX_TEXT:
+            _COUNT_CACHE[(name, text)] = count
+
+
+def count_tokens(value: Any, model: str | None = None) -> int:
     """Count tokens using tiktoken when available.
 
     Args:
         value: Either a raw string or a Python value to encode as TOON.
+        model: Model whose tokenizer to use; None uses the default chain.
 
     Returns:
         Token count (character count fallback if tiktoken is unavailable).
     """
     text = value if isinstance(value, str) else encode(value)
-    encoder = _get_encoder()
+    encoder = _get_encoder(model)
     if encoder is None:
         return len(text)
-    return len(encoder.encode(text))
+    count = _COUNT_CACHE.get((encoder.name, text))
+    if count is None:
+        count = len(encoder.encode(text))
+        _cache_counts(encoder.name, [text], [count])
+    return count
+
+
+def count_tokens_many(
+    texts: Iterable[Any], models: Iterable[str | None] | None = None, num_threads: int = 8
+) -> dict[str | None, list[int]]:
+    """Count tokens for many texts against one or more models in batches.
+
+    Texts missing from the shared count cache are tokenized with tiktoken's
+    multithreaded `encode_batch`, once per distinct encoding; models that
+    share an encoding share the work. Fewer than eight missing texts are
+    encoded one by one, which is faster than starting the thread pool.
+
+    Args:
+        texts: Raw strings or Python values to encode as TOON.
+        models: Model names; None (the default) counts with the default chain
+            under the key None.
+        num_threads: Threads passed to `encode_batch`.
+
+    Returns:
+        Dict mapping each model to the counts, in the order of `texts`.
+    """
+    texts = [text if isinstance(text, str) else encode(text) for text in texts]
+    result: dict[str | None, list[int]] = {}
+    for model in [None] if models is None else models:
+        encoder = _get_encoder(model)
+        if encoder is None:
+            result[model] = [len(text) for text in texts]
+            continue
+        known: dict[str, int | None] = {}
+        missing = []
+        for text in texts:
+            if text not in known:
+                known[text] = _COUNT_CACHE.get((encoder.name, text))
+                if known[text] is None:
+                    missing.append(text)
+        if missing:
+            if len(missing) < _BATCH_MIN:
+                counts = [len(encoder.encode(text)) for text in missing]
+            else:
+                counts = [len(tokens) for tokens in encoder.encode_batch(missing, num_threads=num_threads)]
+            known.update(zip(missing, counts))
+            _cache_counts(encoder.name, missing, counts)
+        result[model] = [known[text] for text in texts]
+    return result
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of `text` without a tokenizer.
+
+    Much cheaper than `count_tokens` and stable across environments, so it is
+    suited to comparing many candidate encodings. Not exact for any model.
+    """
+    return len(_ESTIMATE_RE.findall(text))
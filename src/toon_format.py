@@ -1,21 +1,79 @@
-"""Public API for TOON format."""
+"""Public API for TOON format.
+
+Submodules are imported on first attribute access (PEP 562), so
+`import toon_format` stays cheap for cold-started processes.
+"""
+
+from __future__ import annotations
+
+import importlib
 
 __version__ = "0.1.1"
 
-from compare import compare_formats, estimate_savings
-from convert import convert_format
-from decoder import decode
-from encoder import encode
-from formats import encode_as, encode_best
-from tokens import count_tokens
-
-__all__ = [
-    "encode",
-    "decode",
-    "encode_as",
-    "encode_best",
-    "convert_format",
-    "estimate_savings",
-    "compare_formats",
-    "count_tokens",
-]
+# Avoid importing `typing` at runtime; it dominates the cost of a bare import.
+TYPE_CHECKING = False
+
+# Public name -> defining module.
+_EXPORTS = {
+    "encode": "encoder",
+    "encode_chunks": "chunking",
+    "decode": "decoder",
+    "decode_csv": "decoder",
+    "InternTable": "decoder",
+    "decode_lazy": "lazy",
+    "encode_bytes": "buffers",
+    "decode_bytes": "buffers",
+    "dump": "buffers",
+    "load": "buffers",
+    "query": "query",
+    "select": "query",
+    "encode_as": "formats",
+    "encode_jsonl": "convert",
+    "encode_best": "formats",
+    "convert_format": "convert",
+    "convert_stream": "convert",
+    "estimate_savings": "compare",
+    "dedupe_savings": "compare",
+    "compare_formats": "compare",
+    "compare_corpus": "compare",
+    "CorpusReport": "compare",
+    "count_tokens": "tokens",
+    "count_tokens_many": "tokens",
+    "estimate_tokens": "tokens",
+    "warmup": "tokens",
+    "SchemaRegistry": "schema",
+    "fingerprint": "fingerprint",
+    "RowHasher": "fingerprint",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from buffers import decode_bytes, dump, encode_bytes, load
+    from chunking import encode_chunks
+    from compare import CorpusReport, compare_corpus, compare_formats, dedupe_savings, estimate_savings
+    from convert import convert_format, convert_stream, encode_jsonl
+    from decoder import InternTable, decode, decode_csv
+    from encoder import encode
+    from fingerprint import RowHasher, fingerprint
+    from formats import encode_as, encode_best
+    from lazy import decode_lazy
+    from query import query, select
+    from schema import SchemaRegistry
+    from tokens import count_tokens, count_tokens_many, estimate_tokens, warmup
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    # Cache on the module so later lookups skip __getattr__.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
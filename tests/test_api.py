@@ -0,0 +1,22 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import toon_format
+
+
+def test_public_names_resolve_lazily():
+    for name in toon_format.__all__:
+        assert callable(getattr(toon_format, name))
+    assert set(toon_format.__all__) <= set(dir(toon_format))
+    with pytest.raises(AttributeError):
+        toon_format.not_a_function
+
+
+def test_import_does_not_load_submodules():
+    code = "import sys, toon_format; print(sorted({'encoder', 'decoder', 'tokens'} & set(sys.modules)))"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(toon_format.__file__))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,52 @@
+import pytest
+
+from toon_format import decode, decode_bytes, dump, encode, encode_bytes, load
+
+
+DATA = {
+    "users": [{"id": 1, "name": "Zoë"}, {"id": 2, "name": "x|]"}],
+    "meta": {"tags": ["a", ["b", {"q": "}"}]], "empty": {}},
+    "note": "quote \" and\nnewline",
+}
+
+
+def test_bytes_roundtrip():
+    data = encode_bytes(DATA)
+    assert data == encode(DATA).encode("utf-8")
+    assert decode_bytes(data) == DATA
+    assert decode_bytes(memoryview(bytearray(data))) == DATA
+    assert decode_bytes(b"^{id,name}[1,A|2,B]") == decode("^{id,name}[1,A|2,B]")
+
+
+def test_dump_targets():
+    out = bytearray(b"x")
+    size = dump([1, 2], out)
+    assert out == b"x[1|2]" and size == 5
+    buf = bytearray(8)
+    dump([1, 2], memoryview(buf))
+    assert bytes(buf[:5]) == b"[1|2]"
+
+
+def test_load_mmap(tmp_path):
+    path = tmp_path / "data.toon"
+    with open(path, "wb") as fp:
+        dump(DATA, fp)
+    assert load(path) == DATA
+    empty = tmp_path / "empty.toon"
+    empty.write_bytes(b"")
+    assert load(empty) is None
+
+
+def test_dump_streams_large_tables(monkeypatch):
+    import encoder
+
+    monkeypatch.setattr(encoder, "_ROW_CHUNK", 3)
+    rows = [{"id": i, "name": f"ü{i}"} for i in range(10)]
+    data = {"rows": rows, "tail": [rows[:2], {"x": 1.5}]}
+    out = bytearray()
+    assert dump(data, out) == len(out)
+    assert bytes(out) == encode_bytes(data) == encode(data).encode("utf-8")
+    small = bytearray(4)
+    with pytest.raises(ValueError, match="too small"):
+        dump(data, memoryview(small))
+    assert bytes(small) == out[:4]
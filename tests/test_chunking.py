@@ -0,0 +1,44 @@
+import pytest
+
+from toon_format import decode, encode, encode_chunks
+
+
+def test_encode_chunks_small_value_is_whole():
+    data = {"a": [1, 2], "b": "x"}
+    assert list(encode_chunks(data, 100)) == [encode(data)]
+
+
+def test_encode_chunks_repeats_table_header():
+    rows = [{"id": i, "name": f"user{i}"} for i in range(20)]
+    chunks = list(encode_chunks({"users": rows, "meta": {"v": 1}}, 60))
+    assert len(chunks) > 2
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    decoded = [decode(chunk) for chunk in chunks]
+    tables = [d["users"] for d in decoded if "users" in d]
+    assert all(chunk.startswith("{users|^csv[id,name|") for chunk in chunks if "users" in chunk)
+    assert [row for table in tables for row in table] == rows
+    assert {"meta": {"v": 1}} in decoded
+
+
+def test_encode_chunks_rejects_oversized_row():
+    with pytest.raises(ValueError, match="max_tokens"):
+        list(encode_chunks([{"id": 1, "text": "x" * 50}, {"id": 2, "text": "y"}], 20))
+
+
+def test_encode_chunks_counts_each_piece_once(monkeypatch):
+    import chunking
+
+    batches = []
+
+    def count(texts, models):
+        batches.append(list(texts))
+        return {model: [len(text) for text in texts] for model in models}
+
+    monkeypatch.setattr(chunking, "count_tokens_many", count)
+    data = {"a": {"b": [[f"item{i}", {"n": i, "s": "x" * 8}] for i in range(12)]}}
+    chunks = list(encode_chunks(data, 40))
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert [item for chunk in chunks for item in decode(chunk)["a"]["b"]] == data["a"]["b"]
+    # Nested pieces are measured in the first batch; later calls only count wrappers.
+    assert sum(len(text) for text in batches[0]) < 2 * len(encode(data))
+    assert all(len(batch) <= 2 for batch in batches[1:])
@@ -0,0 +1,79 @@
+import io
+import sys
+
+from cli import main
+from toon_format import decode
+
+
+def test_cli_encode_files_to_output_dir(tmp_path, capsys):
+    (tmp_path / "a.json").write_text('[{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]', encoding="utf-8")
+    (tmp_path / "b.jsonl").write_text('{"x": 1}\n{"x": 2}\n', encoding="utf-8")
+    out = tmp_path / "out"
+    files = [str(tmp_path / "a.json"), str(tmp_path / "b.jsonl")]
+    assert main(["encode", "--jobs", "2", "-o", str(out), *files]) == 0
+    assert (out / "a.toon").read_text(encoding="utf-8") == "^csv[id,name|1,A|2,B]"
+    assert decode((out / "b.toon").read_text(encoding="utf-8")) == [{"x": 1}, {"x": 2}]
+    stats = capsys.readouterr().err
+    assert "files: 2  records: 4" in stats and "tokens:" in stats
+
+
+def test_cli_decode_stdin_to_stdout(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("^csv[id,name|1,A|2,B]"))
+    assert main(["decode", "--to", "csv", "--quiet"]) == 0
+    captured = capsys.readouterr()
+    assert captured.out == "id,name\n1,A\n2,B\n"
+    assert captured.err == ""
+
+
+def test_cli_reports_errors(tmp_path, capsys):
+    assert main(["convert", "--to", "csv", str(tmp_path / "missing.json")]) == 1
+    assert "toon: error:" in capsys.readouterr().err
+
+
+def test_cli_refuses_unsafe_outputs(tmp_path, capsys):
+    src = tmp_path / "x.json"
+    src.write_text('{"a": 1}', encoding="utf-8")
+    assert main(["convert", "--to", "json", "-q", "-o", str(tmp_path), str(src)]) == 1
+    assert src.read_text(encoding="utf-8") == '{"a": 1}'
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "y.json").write_text("[1]", encoding="utf-8")
+    (tmp_path / "sub" / "y.json").write_text("[2]", encoding="utf-8")
+    out = tmp_path / "out"
+    assert main(["encode", "-q", "-o", str(out), str(tmp_path / "y.json"), str(tmp_path / "sub" / "y.json")]) == 1
+    assert "would both be written" in capsys.readouterr().err
+    assert not out.exists()
+
+
+def test_cli_sniffs_jsonl_on_stdin(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO('{"a":1,"b":"x"}\n{"a":2,"b":"y"}\n'))
+    assert main(["encode", "--quiet"]) == 0
+    assert capsys.readouterr().out == "^csv[a,b|1,x|2,y]\n"
+    # Input that is not valid in the declared format is an error, not an empty result.
+    monkeypatch.setattr(sys, "stdin", io.StringIO('{"a":1,"b":"x"}\n{"a":2,"b":"y"}\n'))
+    assert main(["convert", "--from", "json", "--to", "toon", "--quiet"]) == 1
+    assert "toon: error: Extra data" in capsys.readouterr().err
+
+
+def test_cli_convert_honours_from(monkeypatch, capsys):
+    cases = [
+        ("csv", "t,v\n12:30,1\n13:00,2", '[{"t":"12:30","v":1},{"t":"13:00","v":2}]'),
+        ("csv", "name\nA\nB\n", '[{"name":"A"},{"name":"B"}]'),
+        ("csv", "a\n", "[]"),
+        ("yaml", "- a\n- b\n", '["a","b"]'),
+    ]
+    for source_format, text, expected in cases:
+        monkeypatch.setattr(sys, "stdin", io.StringIO(text))
+        assert main(["convert", "--from", source_format, "--to", "json", "--quiet"]) == 0
+        assert capsys.readouterr().out == expected + "\n"
+
+
+def test_cli_compare_stdin_matches_file(tmp_path, monkeypatch, capsys):
+    text = '[{"id": 1, "name": "A"}, {"id": 2, "name": "B"}, {"id": 3, "name": "C"}]'
+    (tmp_path / "rows.json").write_text(text, encoding="utf-8")
+    assert main(["compare", "--metric", "chars", "--report", "json", str(tmp_path / "rows.json")]) == 0
+    from_file = capsys.readouterr()
+    monkeypatch.setattr(sys, "stdin", io.StringIO(text))
+    assert main(["compare", "--metric", "chars", "--report", "json"]) == 0
+    from_stdin = capsys.readouterr()
+    assert "records: 3" in from_stdin.err
+    assert from_stdin.out == from_file.out
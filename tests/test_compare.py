@@ -1,4 +1,6 @@
-from toon_format import compare_formats, estimate_savings, encode_best
+import json
+
+from toon_format import compare_corpus, compare_formats, dedupe_savings, estimate_savings, encode_best
 
 
 def test_estimate_savings_keys():
@@ -19,3 +21,47 @@ def test_encode_best_selects_csv_for_table():
     data = [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]
     best = encode_best(data, candidates=("toon", "json", "csv"))
     assert best["format"] == "csv"
+
+
+def test_dedupe_savings_reports_tokens():
+    data = {"items": [{"status": "waiting for review"} for _ in range(6)], "note": "waiting for review"}
+    report = dedupe_savings(data)
+    assert report["strings"] == 1
+    assert report["saved_tokens"] == report["toon_tokens"] - report["dedupe_tokens"] > 0
+    assert dedupe_savings({"a": 1})["saved_tokens"] == 0
+
+
+def test_estimate_savings_with_model():
+    data = [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]
+    result = estimate_savings(data, model="gpt-4o")
+    assert result["toon_tokens"] <= result["json_tokens"]
+    assert "Savings" in compare_formats(data, model="gpt-4o")
+
+
+def test_compare_corpus_report(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text('{"id": 1, "name": "A"}\n{"id": 2, "name": "B"}\n', encoding="utf-8")
+    records = [[{"id": i, "tag": "x"} for i in range(5)], "plain text", path]
+    report = compare_corpus(records, formats=("toon", "json", "csv"), metric="chars")
+    assert report.records == 4
+    assert report.counts == {"toon": 4, "json": 4, "csv": 1}
+    assert sum(report.wins.values()) == 4
+    assert report.best in {"toon", "json"}
+    data = report.to_dict()["formats"]["json"]
+    assert data["p50"] <= data["p99"] and data["total"] == report.totals["json"]
+    assert report.to_csv().splitlines()[0] == "format,records,total,mean,p50,p90,p99,wins"
+    parallel = compare_corpus(records, formats=("toon", "json", "csv"), metric="chars", workers=2)
+    assert parallel.to_dict() == report.to_dict()
+
+
+def test_compare_corpus_splits_json_and_csv_files(tmp_path, monkeypatch):
+    import compare
+
+    monkeypatch.setattr(compare, "_JSON_CHUNK", 7)
+    rows = [{"id": i, "name": f"n{i}", "score": 12345.5 + i} for i in range(6)]
+    (tmp_path / "rows.json").write_text(json.dumps(rows, indent=1), encoding="utf-8")
+    (tmp_path / "rows.csv").write_text("id,name\n1,A\n2,B\n", encoding="utf-8")
+    assert list(compare._iter_file(tmp_path / "rows.json")) == rows
+    report = compare_corpus([tmp_path / "rows.json", tmp_path / "rows.csv"], formats=("toon", "json"), metric="chars")
+    assert report.records == 8
+    assert report.percentile("json", 99) < len(json.dumps(rows))
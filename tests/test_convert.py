@@ -0,0 +1,73 @@
+import io
+import json
+
+import pytest
+
+import convert
+from toon_format import SchemaRegistry, convert_format, convert_stream, encode, encode_jsonl
+
+
+def _stream(text, source_format, target_format):
+    out = io.StringIO()
+    count = convert_stream(io.StringIO(text), out, source_format, target_format)
+    return out.getvalue(), count
+
+
+def test_convert_stream_csv_to_toon():
+    assert _stream("id,name\n1,A\n2,\"B c\"\n", "csv", "toon") == ('^csv[id,name|1,A|2,"B c"]', 2)
+    assert _stream("id,name\n", "csv", "toon") == ("[]", 0)
+
+
+def test_convert_stream_jsonl_to_toon():
+    flat = '{"a":1,"b":"x"}\n\n{"a":2,"b":null}\n'
+    assert _stream(flat, "jsonl", "toon") == ("^csv[a,b|1,x|2,null]", 2)
+    nested = flat + '{"a":{"n":1}}\n'
+    assert _stream(nested, "jsonl", "toon") == ("[{a,b|1|x}|{a,b|2|null}|{a|{n|1}}]", 3)
+
+
+def test_convert_stream_toon_table_to_csv(monkeypatch):
+    text = '^csv[id,name|1,"A|\\"b"|2,B]'
+    expected = convert_format(text, "csv")
+    monkeypatch.setattr(convert, "_CHUNK_SIZE", 7)
+    monkeypatch.setattr(convert, "decode", None)
+    assert _stream(text, "toon", "csv") == (expected, 2)
+
+
+def test_convert_stream_schema_table_to_csv(monkeypatch):
+    rows = [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]
+    text = encode(rows, {"schema_registry": SchemaRegistry()})
+    assert text.startswith("^schema^csv[@0,")
+    monkeypatch.setattr(convert, "decode", None)
+    assert _stream(text, "toon", "csv") == ("id,name\n1,A\n2,B", 2)
+    # Without the preamble, a leading @N is an ordinary column.
+    assert _stream("^csv[@0,id|1,2]", "toon", "csv") == ("@0,id\n1,2", 1)
+
+
+def test_convert_stream_fallback():
+    assert _stream("{a|1}", "toon", "json") == ('{"a":1}', 1)
+
+
+def test_encode_jsonl_union_schema():
+    lines = ['{"id":1,"ok":true}', '{"ok":false,"id":2,"err":"timeout"}', ""]
+    assert encode_jsonl(lines) == "^csv[id,ok,err|1,true,|2,false,timeout]"
+    assert encode_jsonl(io.StringIO('{"id":1}\n[1,2]\n')) == "[{id|1}|[1|2]]"
+    assert encode_jsonl([]) == "[]"
+
+
+def test_encode_jsonl_flattens_nested_records():
+    lines = ['{"id":1,"geo":{"lat":1.5,"lon":2}}', '{"id":2,"geo":{"lon":3,"lat":4},"tag":"a\\"b"}']
+    text = encode_jsonl(lines)
+    records = [json.loads(line) for line in lines]
+    assert text == '^csv[id,geo.lat,geo.lon,tag|1,1.5,2,|2,4,3,"a\\"b"]'
+    assert text == encode(records)
+    assert json.loads(convert_format(text, "json")) == records
+
+
+def test_convert_stream_honours_source_format():
+    # Detection would read these as a TOON/YAML scalar and drop the rows.
+    assert _stream("t,v\n12:30,1\n13:00,2\n", "csv", "json") == ('[{"t":"12:30","v":1},{"t":"13:00","v":2}]', 2)
+    assert _stream("name\nA\nB\n", "csv", "json") == ('[{"name":"A"},{"name":"B"}]', 2)
+    assert _stream("a\n", "csv", "json") == ("[]", 0)
+    assert _stream("- a\n- b\n", "yaml", "json") == ('["a","b"]', 2)
+    with pytest.raises(ValueError):
+        _stream('{"a":1}\n{"a":2}\n', "json", "toon")
@@ -1,4 +1,7 @@
-from toon_format import decode, encode
+import io
+import sys
+
+from toon_format import InternTable, decode, decode_bytes, decode_csv, encode, encode_as
 
 
 def test_decode_primitive_array():
@@ -12,6 +15,23 @@ def test_decode_tabular_array():
     assert decode(legacy) == [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]
 
 
+def test_decode_sparse_table_roundtrip():
+    data = [{"id": 1, "name": ""}, {"name": "B", "id": 2, "tag": None}, {"id": 3}]
+    assert decode(encode(data)) == data
+
+
+def test_decode_flattened_table_roundtrip():
+    data = [{"id": 1, "geo": {"lat": 1.5, "pos": {"x": 0}}, "a.b": 1}, {"id": 2, "geo": {"lat": 4}, "a.b": 2}]
+    assert decode(encode(data)) == data
+
+
+def test_decode_json_fragment():
+    encoded = '{id,payload|7|^json{"a":[1,{"b":"}|"}]}}'
+    assert decode(encoded) == {"id": 7, "payload": {"a": [1, {"b": "}|"}]}}
+    data = {"users": [{"id": 1, "geo": {"lat": 2}}], "tags": ["a", "b"]}
+    assert decode(encode(data, options={"mode": "hybrid"})) == data
+
+
 def test_decode_mixed_array():
     encoded = "[{x|1}|42|hi]"
     assert decode(encoded) == [{"x": 1}, 42, "hi"]
@@ -29,3 +49,45 @@ def test_decode_json_yaml_csv():
     assert decode(json_input) == {"a": 1, "b": [2, 3]}
     assert decode(yaml_input) == {"a": 1, "b": 2}
     assert decode(csv_input) == [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]
+
+
+def test_decode_yaml_roundtrip_nested():
+    data = {"users": [{"id": 1, "tags": ["a", "b c"]}, {"id": 2, "tags": [[1, -2.5], "x:y"]}], "meta": {"ok": True}}
+    text = encode_as(data, "yaml")
+    assert text.splitlines()[:4] == ["users:", "  -", "    id: 1", "    tags:"]
+    assert decode(text) == data
+
+
+def test_decode_csv_typed_and_columnar():
+    text = "id,name,score,ok\n1,Ann,1.5,true\n2,007,,false\n3,Bo,2,null\n"
+    rows = decode_csv(io.StringIO(text), {"sample_rows": 1})
+    assert rows[1] == {"id": 2, "name": "007", "score": "", "ok": False}
+    assert rows[2] == {"id": 3, "name": "Bo", "score": 2.0, "ok": None}
+    columns = decode_csv(text, {"columnar": True})
+    assert columns == {"id": [1, 2, 3], "name": ["Ann", 7, "Bo"], "score": [1.5, "", 2], "ok": [True, False, None]}
+
+
+def test_decode_interns_keys_and_optional_values():
+    text = "[{status,region|active|eu-west}|{status,region|active|eu-west}]"
+    first, second = decode(text)
+    assert [k for k in first][0] is [k for k in second][0]
+    first, second = decode(text, {"intern_values": True})
+    assert first["status"] is second["status"]
+    rows = decode_bytes(b"^csv[id,status|1,active|2,active]", {"intern_values": True})
+    assert rows[0]["status"] is rows[1]["status"]
+    values = InternTable(max_size=1, max_length=6)
+    a = decode_csv("s,t\nactive,eu-west\nactive,eu-west\n", {"intern_values": values})
+    b = decode("[active|eu-west]", {"intern_values": values})
+    assert a[0]["s"] is a[1]["s"] is b[0]
+    # Over `max_length` and past `max_size`, values are not added.
+    assert len(values) == 1
+
+
+def test_decode_keeps_keys_out_of_the_global_intern_pool():
+    # Globally interned strings are immortal, so decoded keys must not join them.
+    probe = sys.intern("".join(["decode", "_probe_key"]))
+    text = "[{decode_probe_key|1}|^csv[decode_probe_key|2]]"
+    for value in (decode(text), decode_bytes(text.encode())):
+        first, second = (next(iter(row)) for row in (value[0], value[1][0]))
+        assert first is second
+        assert first == probe and first is not probe
@@ -1,9 +1,10 @@
+import uuid
 from datetime import datetime
 from decimal import Decimal
 
 import pytest
 
-from toon_format import encode
+from toon_format import decode, encode, estimate_tokens
 from formats import encode_as
 
 
@@ -22,6 +23,40 @@ def test_encode_tabular_array():
     assert encode(data) == "^csv[id,name|1,A|2,B]"
 
 
+def test_encode_sparse_tabular_array():
+    data = [{"id": 1, "name": "A"}, {"name": "B", "id": 2, "tag": "x"}]
+    assert encode(data) == "^csv[id,name,tag|1,A,|2,B,x]"
+    assert encode(data, options={"sparsity": 0}).startswith("[")
+    with pytest.raises(ValueError):
+        encode(data, options={"sparsity": 2})
+
+
+def test_encode_quotes_cells_with_quotes_and_backslashes():
+    # Unquoted, a `"` would open a quoted run and `\` would escape the next separator.
+    data = [{"a": 'q"q', "b": 1}, {"b": 2, "c": "x\\"}, {"a": "p", "c": "y"}]
+    text = encode(data)
+    assert text == '^csv[a,b,c|"q\\"q",1,|,2,"x\\\\"|p,,y]'
+    assert decode(text) == data
+    assert decode(encode({"k": 'a"b'})) == {"k": 'a"b'}
+
+
+def test_encode_flattened_nested_columns():
+    data = [{"id": 1, "geo": {"lat": 1.5, "lon": 2}}, {"id": 2, "geo": {"lon": 3, "lat": 4}}]
+    assert encode(data) == "^csv[id,geo.lat,geo.lon|1,1.5,2|2,4,3]"
+    assert encode([{"a.b": 1}]) == '^csv["a.b"|1]'
+    assert encode(data, options={"flatten": False}).startswith("[{")
+
+
+def test_encode_flattened_cells_with_quotes_round_trip():
+    data = [{"a": 'q"q'}, {"c": {"x": 1, "y": 'z"'}}]
+    text = encode(data)
+    assert text == '^csv[a,c.x,c.y|"q\\"q",,|,1,"z\\""]'
+    assert decode(text) == data
+    # A nested key that needs quoting cannot be a dotted path segment.
+    nested = [{"c": {'k"': 1}}, {"c": {'k"': 2}}]
+    assert decode(encode(nested)) == nested
+
+
 def test_encode_mixed_array():
     data = [{"x": 1}, 42, "hi"]
     assert encode(data) == "[{x|1}|42|hi]"
@@ -46,6 +81,53 @@ def test_encode_auto_selects_csv_for_table():
     assert result.startswith("id,name")
 
 
+def test_encode_hybrid_picks_cheaper_table():
+    rows = [{"identifier": i, "description": "item", f"u{i}": 1} for i in range(6)]
+    assert encode(rows).startswith("[{")
+    hybrid = encode(rows, options={"mode": "hybrid"})
+    assert hybrid.startswith("^csv[identifier,description,u0")
+    assert estimate_tokens(hybrid) < estimate_tokens(encode(rows))
+
+
+def test_encode_hybrid_handles_values_json_cannot():
+    ident = uuid.UUID(int=1)
+    data = {"id": ident, "tags": {"a"}, "pair": ([1], 2), "at": (datetime(2024, 1, 2), Decimal("1.5"))}
+    assert encode(data, options={"mode": "hybrid"}) == encode(data)
+    nested = [{"k": ident, "n": [1, 2, 3]}] * 3
+    assert decode(encode(nested, options={"mode": "hybrid"})) == decode(encode(nested))
+
+
 def test_encode_unknown_mode():
     with pytest.raises(ValueError):
         encode({"a": 1}, options={"mode": "nope"})
+
+
+def test_encode_dedupe_strings():
+    url = "https://example.com/status/ok"
+    data = [{"id": i, "url": url, "state": "completed"} for i in range(4)]
+    encoded = encode(data, options={"dedupe_strings": True})
+    assert encoded == (
+        "^dict[https://example.com/status/ok]"
+        "^csv[id,url,state|0,@0,completed|1,@0,completed|2,@0,completed|3,@0,completed]"
+    )
+    assert decode(encoded) == data
+    # Nothing worth replacing leaves the output unchanged.
+    small = {"a": "completed", "b": ["@0", "x"]}
+    assert encode(small, options={"dedupe_strings": True}) == encode(small)
+
+
+def test_encode_floats_round_trip_by_default():
+    data = [0.1 + 0.2, 1234567.0, 1e-05, -0.0, 2.5]
+    encoded = encode(data)
+    assert encoded == "[0.30000000000000004|1234567|1e-05|0|2.5]"
+    assert decode(encoded) == data
+
+
+def test_encode_float_format_policies():
+    rows = [{"cpu": 12.3456, "lat": 0.000123456, "n": 3}, {"cpu": 7.0, "lat": -0.00001, "n": 4}]
+    assert encode([3.14159265, 0.5], {"float_format": "sig:3"}) == "[3.14|0.5]"
+    assert encode([3.14159265, -0.001], {"float_format": "fixed:2"}) == "[3.14|0]"
+    per_column = {"float_format": {"cpu": "fixed:1", "*": "sig:2"}}
+    assert encode({"rows": rows, "x": 9.876}, per_column) == "{rows,x|^csv[cpu,lat,n|12.3,0.00012,3|7,-1e-05,4]|9.9}"
+    with pytest.raises(ValueError, match="float format"):
+        encode([1.5], {"float_format": "sig:0"})
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from toon_format import RowHasher, encode, fingerprint
+
+
+def test_fingerprint_follows_encoded_output():
+    a = {"n": 1, "x": Decimal("2.5"), "d": date(2024, 1, 2), "z": -0.0, "bad": float("nan")}
+    b = {"n": 1.0, "x": 2.5, "d": "2024-01-02", "z": 0, "bad": None}
+    assert encode(a) == encode(b)
+    assert fingerprint(a) == fingerprint(b)
+    assert len(fingerprint(a)) == 32
+
+
+def test_fingerprint_distinguishes_values():
+    values = [{"a": 1}, {"a": "1"}, {"a": True}, {"a": "true"}, [1, 2], [2, 1], {"a": [1]}, {"a": {}}, []]
+    assert len({fingerprint(v) for v in values}) == len(values)
+    assert fingerprint({"a": 1, "b": 2}) != fingerprint({"b": 2, "a": 1})
+
+
+def test_row_hasher_matches_fingerprint_and_finds_duplicates():
+    rows = [{"id": 1, "tag": "x"}, {"id": 2, "tag": "y"}, {"id": 1, "tag": "x"}]
+    hasher = RowHasher()
+    keys = [hasher.add(row) for row in rows]
+    assert keys[0] == keys[2] == fingerprint(rows[0])
+    assert keys[0] != keys[1]
+    assert hasher.hexdigest() == fingerprint(rows)
+    assert RowHasher(rows).hexdigest() == fingerprint(rows)
+    assert len(hasher) == 3
+
+
+def test_fingerprint_tables_follow_column_order():
+    a = [{"a": 1, "b": 2}, {"b": 3, "a": 4}]
+    b = [{"a": 1, "b": 2}, {"a": 4, "b": 3}]
+    assert encode(a) == encode(b)
+    assert fingerprint(a) == fingerprint(b) == RowHasher(a).hexdigest()
+    c = [{"b": 2, "a": 1}, {"a": 4, "b": 3}]
+    assert encode(c) != encode(a)
+    assert fingerprint(c) != fingerprint(a)
+    sparse = [{"a": 1}, {"b": 2}, {"c": 3}]
+    assert RowHasher(sparse).hexdigest() == fingerprint(sparse)
+
+
+def test_fingerprint_tables_normalize_cells_first():
+    rows = [{"t": datetime(2020, 1, 1), "x": Decimal("1.5")}, {"t": datetime(2020, 1, 2), "x": Decimal("2")}]
+    plain = [{"t": "2020-01-01T00:00:00", "x": 1.5}, {"t": "2020-01-02T00:00:00", "x": 2.0}]
+    assert encode(rows) == encode(plain)
+    assert fingerprint(rows) == fingerprint(plain)
+    hasher = RowHasher(plain[:1])
+    assert hasher.add(rows[1]) == fingerprint(plain[1])
+    assert hasher.hexdigest() == fingerprint(plain)
@@ -0,0 +1,47 @@
+import pytest
+
+from toon_format import decode, decode_lazy, encode, query
+
+
+DATA = {
+    "users": [{"id": 1, "name": "Alice"}, {"id": 2, "name": "x|]"}],
+    "meta": {"tags": [1, [2, {"q": "}"}]], "empty": {}},
+    "note": "hi [there]",
+    "none": None,
+}
+
+
+def test_decode_lazy_matches_decode():
+    text = encode(DATA)
+    lazy = decode_lazy(text)
+    assert lazy == decode(text)
+    assert lazy.materialize() == DATA
+
+
+def test_decode_lazy_random_access():
+    lazy = decode_lazy(encode(DATA))
+    assert lazy["users"][1]["name"] == "x|]"
+    assert lazy["meta"]["tags"][-1][1]["q"] == "}"
+    assert lazy["meta"] is lazy["meta"]
+    assert list(lazy) == ["users", "meta", "note", "none"]
+
+
+def test_decode_lazy_tables():
+    assert decode_lazy("^csv[id,name|1,A|2,B]")[1] == {"id": 2, "name": "B"}
+    assert decode_lazy("^{id,name}[1,A|2,B]") == [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]
+    assert len(decode_lazy("^csv[id]")) == 0
+    table = decode_lazy('^csv[id,name|1,"a|b"|2,B|]')
+    assert len(table) == 2 and table[-2] == {"id": 1, "name": "a|b"}
+    with pytest.raises(IndexError):
+        table[2]
+
+
+def test_decode_lazy_bare_quote_and_json_fragment():
+    # A quote inside a bare token must not open a string.
+    text = encode({"a": [{"k": 'x:"y', "m": [1, 2]}, [3]], "b": {"c": [4, 5]}, "z": 9})
+    assert decode_lazy(text)["z"] == 9
+    assert query(text, "z") == [9]
+    text = '{a,b,z|^json{"k": "}]", "n": [1]}|[1|2]|9}'
+    assert decode_lazy(text)["a"] == {"k": "}]", "n": [1]}
+    assert decode_lazy(text)["z"] == 9
+    assert query(text, "b[1]") == [2]
@@ -0,0 +1,38 @@
+import pytest
+
+from toon_format import encode, query, select
+
+
+DATA = {
+    "users": [{"id": 1, "name": "Alice"}, {"id": 2, "name": "x|]"}],
+    "meta": {"tags": ["a", ["b", {"q": "}"}]], "dotted.key": 5},
+}
+
+
+def test_query_table_column():
+    text = encode(DATA)
+    assert query(text, "users[*].name") == ["Alice", "x|]"]
+    assert query(text, "users[-1]") == [{"id": 2, "name": "x|]"}]
+    assert query("^{id,name}[1,A|2,B]", "[*].id") == [1, 2]
+
+
+def test_query_nested_paths():
+    text = encode(DATA)
+    assert query(text, "meta.tags[1][1].q") == ["}"]
+    assert query(text, 'meta["dotted.key"]') == [5]
+    assert query(text, "meta.*")[1] == 5
+    assert query(text, "missing.path") == []
+
+
+def test_query_flattened_columns():
+    text = encode([{"id": 1, "geo": {"lat": 1, "lon": 2}}, {"id": 2, "geo": {"lat": 3, "lon": 4}}])
+    assert query(text, "[*].geo.lat") == [1, 3]
+    assert query(text, "[1].geo") == [{"lat": 3, "lon": 4}]
+
+
+def test_select_default_and_invalid_path():
+    text = encode(DATA)
+    assert select(text, "users[0].id") == 1
+    assert select(text, "users[9].id", default="none") == "none"
+    with pytest.raises(ValueError):
+        query(text, "users[")
@@ -0,0 +1,64 @@
+import pytest
+
+from toon_format import SchemaRegistry, decode, decode_bytes, decode_lazy, encode, query
+
+
+def test_schema_registry_references_repeated_headers():
+    registry = SchemaRegistry()
+    rows = [{"id": 1, "name": "A"}, {"id": 2, "name": "B"}]
+    first = encode({"a": rows, "b": {"id": 3, "name": "C"}}, {"schema_registry": registry})
+    second = encode(rows, {"schema_registry": registry})
+    assert first == "^schema{@0,a,b|^csv[@1,id,name|1,A|2,B]|{@1|3|C}}"
+    assert second == "^schema^@1[1,A|2,B]"
+    assert decode(second, {"schema_registry": registry}) == rows
+    assert decode(first) == {"a": rows, "b": {"id": 3, "name": "C"}}
+
+
+def test_schema_registry_shared_across_processes():
+    writer = SchemaRegistry()
+    docs = [encode({"x": i, "y": {"p.q": i}}, {"schema_registry": writer}) for i in range(3)]
+    reader = SchemaRegistry(writer.schemas())
+    assert [decode(doc, {"schema_registry": reader}) for doc in docs] == [{"x": i, "y": {"p.q": i}} for i in range(3)]
+    assert decode_bytes(docs[2].encode(), {"schema_registry": reader}) == {"x": 2, "y": {"p.q": 2}}
+    # A fresh registry learns definitions as documents are decoded in order.
+    learner = SchemaRegistry()
+    assert [decode(doc, {"schema_registry": learner}) for doc in docs][-1] == {"x": 2, "y": {"p.q": 2}}
+    assert learner.schemas() == writer.schemas()
+
+
+def test_schema_reference_errors_and_quoting():
+    with pytest.raises(ValueError, match="Unknown schema id"):
+        decode("^schema{@0|1|2}")
+    with pytest.raises(ValueError, match="schema_registry"):
+        decode_lazy("^schema{@0|1|2}")
+    assert decode_lazy("^schema{@0,a,b|1|2}")["b"] == 2
+    assert encode({"@1": "@2"}) == '{"@1"|"@2"}'
+    assert decode(encode({"@1": "@2", "k": "@x"})) == {"@1": "@2", "k": "@x"}
+
+
+def test_schema_ids_need_a_preamble_or_registry():
+    # Before schema references, `@N` was a valid unquoted key.
+    legacy = "{@2,b|x|^csv[@3,c|1,2]}"
+    expected = {"@2": "x", "b": [{"@3": 1, "c": 2}]}
+    assert decode(legacy) == expected
+    assert decode_bytes(legacy.encode()) == expected
+    assert decode_lazy(legacy)["@2"] == "x"
+    assert list(decode_lazy(legacy)["b"]) == expected["b"]
+    assert query(legacy, "b[0]") == [{"@3": 1, "c": 2}]
+    assert decode("^schema" + legacy) == {"b": "x"}
+
+
+def test_lazy_and_query_resolve_references_defined_in_the_document():
+    registry = SchemaRegistry()
+    value = {"a": {"id": 1, "name": "x"}, "b": [{"id": 2, "name": "y"}, {"id": 3, "name": "z"}], "c": {"id": 4, "name": "w"}}
+    text = encode(value, {"schema_registry": registry})
+    assert "{@1|4|w}" in text and "^@1[" in text
+    lazy = decode_lazy(text)
+    assert lazy.materialize() == value
+    assert dict(lazy["c"]) == value["c"]
+    assert list(lazy["b"]) == value["b"]
+    assert query(text, "b[*].name") == ["y", "z"]
+    assert query(text, "c") == [value["c"]]
+    # A reference defined only in another document still needs decode() with the registry.
+    with pytest.raises(ValueError, match="schema_registry"):
+        query(encode([{"id": 5, "name": "v"}], {"schema_registry": registry}), "[0].id")
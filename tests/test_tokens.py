@@ -1,4 +1,4 @@
-from toon_format import count_tokens
+from toon_format import count_tokens, count_tokens_many, estimate_tokens, warmup
 
 
 def test_count_tokens_string():
@@ -7,3 +7,45 @@ def test_count_tokens_string():
 
 def test_count_tokens_value():
     assert isinstance(count_tokens({"a": 1}), int)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("{a|1}") < estimate_tokens('{"a":1,"b":[1,2,3]}')
+
+
+def test_warmup():
+    assert warmup(background=False) is None
+    thread = warmup(["gpt-4o"])
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+
+
+def test_count_tokens_many_batches_per_encoding(monkeypatch):
+    import tokens
+
+    class FakeEncoding:
+        def __init__(self, name):
+            self.name = name
+            self.batches = []
+
+        def encode(self, text):
+            return text.split()
+
+        def encode_batch(self, texts, num_threads=8):
+            self.batches.append(list(texts))
+            return [text.split() for text in texts]
+
+    shared = FakeEncoding("fake_base")
+    encodings = {"m1": shared, "m2": shared, "m3": FakeEncoding("fake_other")}
+    monkeypatch.setattr(tokens, "_get_encoder", lambda model=None: encodings[model])
+    monkeypatch.setattr(tokens, "_COUNT_CACHE", {})
+    texts = ["a b", "c", "a b"] + [f"w{i} x" for i in range(8)]
+    counts = count_tokens_many(texts, models=["m1", "m2", "m3"])
+    expected = [2, 1, 2] + [2] * 8
+    assert counts == {"m1": expected, "m2": expected, "m3": expected}
+    assert shared.batches == [["a b", "c"] + texts[3:]]
+    # Small batches skip encode_batch.
+    assert count_tokens_many(["c", "d e f"], models=["m2"]) == {"m2": [1, 3]}
+    assert len(shared.batches) == 1
+    assert count_tokens("d e f", model="m1") == 3